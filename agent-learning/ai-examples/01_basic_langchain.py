@@ -13,15 +13,51 @@ Key Concepts:
 """
 
 from langchain_openai import ChatOpenAI
+from openai import OpenAI
+from langchain_community.cache import SQLiteCache
+from langchain.globals import set_llm_cache
+from langchain_core.rate_limiters import InMemoryRateLimiter
+import asyncio
+import functools
+import json
 import os
+import time
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
-load_dotenv(dotenv_path="../../.env")
+# (skipped when the key is already set, e.g. injected by CI or a container)
+if "OPENAI_API_KEY" not in os.environ:
+    load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env")
+
+# 📖 LESSON: Caching responses
+# Re-running a lesson sends the exact same prompts again. With an LLM cache
+# installed, repeated prompts are answered from a local SQLite file instead
+# of a new API call.
+set_llm_cache(SQLiteCache(database_path=".langchain.db"))
+
+# 📖 LESSON: Picking a model
+# Short tweets and hashtags don't need the biggest model. gpt-4o-mini is much
+# cheaper and faster; set OPENAI_MODEL in your .env to try a different one.
+MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# 📖 LESSON: Staying under rate limits
+# Sending many requests at once is fast until OpenAI answers with 429 errors
+# and the retries eat up the savings. The rate limiter spaces requests out to
+# OPENAI_QPM per minute, and max_concurrency caps how many run at once.
+OPENAI_QPM = int(os.getenv("OPENAI_QPM", "500"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "20"))
+RATE_LIMITER = InMemoryRateLimiter(
+    requests_per_second=OPENAI_QPM / 60,
+    max_bucket_size=OPENAI_MAX_CONCURRENCY
+)
 
 # 📖 LESSON: Setting up your AI model
 # ChatOpenAI is the interface to GPT models
-def setup_ai_model():
+# lru_cache builds one client per max_tokens value and hands back the same
+# instance on every call, so its HTTP connection pool is reused
+@functools.lru_cache(maxsize=None)
+def setup_ai_model(max_tokens=500):
     """Set up the AI model with your API key"""
 
     # API key is automatically loaded from .env file
@@ -31,9 +67,10 @@ def setup_ai_model():
         raise ValueError("OpenAI API key not found! Make sure OPENAI_API_KEY is set in your .env file")
 
     llm = ChatOpenAI(
-        model="gpt-4.1",  # The AI model to use
+        model=MODEL,            # The AI model to use
         temperature=0.9,        # How creative (0 = precise, 1 = creative)
-        max_tokens=500         # Maximum response length
+        max_tokens=max_tokens,  # Maximum response length (shorter = faster)
+        rate_limiter=RATE_LIMITER
     )
 
     return llm
@@ -42,8 +79,8 @@ def setup_ai_model():
 def basic_ai_call():
     """Make a simple call to the AI"""
 
-    # Set up the model
-    llm = setup_ai_model()
+    # Set up the model (a tweet only needs a short response)
+    llm = setup_ai_model(max_tokens=100)
 
     # Your question/prompt
     prompt = "Write a fun tweet about coffee in under 280 characters"
@@ -55,11 +92,53 @@ def basic_ai_call():
     print(response.content)
     print(f"\n📊 Response length: {len(response.content)} characters")
 
+# 📖 LESSON: Batch jobs for non-urgent prompts
+# OpenAI's Batch API runs requests in the background at half the price. Results
+# can take minutes to hours, which is fine for scripted demos but not for a
+# user waiting on an answer. Set USE_BATCH_API=1 to try it.
+def run_batch_job(conversations, max_tokens=500):
+    """Run chat conversations through the OpenAI Batch API and return the replies in order"""
+
+    client = OpenAI()
+
+    # One JSON line per request; custom_id lets us put the answers back in order
+    lines = [
+        json.dumps({
+            "custom_id": f"request-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": MODEL, "temperature": 0.9, "max_tokens": max_tokens, "messages": messages}
+        })
+        for i, messages in enumerate(conversations)
+    ]
+    batch_file = client.files.create(file=("batch.jsonl", "\n".join(lines).encode()), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+
+    print(f"⏳ Batch {batch.id} submitted, waiting for results...")
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(30)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} finished with status: {batch.status}")
+
+    replies = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        item = json.loads(line)
+        if item.get("response") and item["response"]["status_code"] == 200:
+            replies[item["custom_id"]] = item["response"]["body"]["choices"][0]["message"]["content"]
+
+    return [replies.get(f"request-{i}", "❌ No result") for i in range(len(conversations))]
+
 # 📖 LESSON: Understanding different types of prompts
-def different_prompt_examples():
+async def different_prompt_examples():
     """Try different types of prompts to see how AI responds"""
 
-    llm = setup_ai_model()
+    llm = setup_ai_model(max_tokens=300)
 
     prompts = [
         "Write a professional LinkedIn post about social media strategy",
@@ -68,19 +147,26 @@ def different_prompt_examples():
         "What's the best time to post on Instagram for maximum engagement?"
     ]
 
-    for i, prompt in enumerate(prompts, 1):
+    if os.getenv("USE_BATCH_API"):
+        conversations = [[{"role": "user", "content": prompt}] for prompt in prompts]
+        replies = await asyncio.to_thread(run_batch_job, conversations, 300)
+    else:
+        # The prompts don't depend on each other, so send them all at once
+        # instead of waiting for each response before starting the next one
+        responses = await llm.abatch(prompts, config={"max_concurrency": OPENAI_MAX_CONCURRENCY})
+        replies = [response.content for response in responses]
+
+    for i, (prompt, reply) in enumerate(zip(prompts, replies), 1):
         print(f"\n--- Example {i} ---")
         print(f"📝 Prompt: {prompt}")
-
-        response = llm.invoke(prompt)
-        print(f"🤖 Response: {response.content}")
+        print(f"🤖 Response: {reply}")
         print("-" * 50)
 
 # 📖 LESSON: PostProber context
 def postprober_content_helper():
     """Example of how this could help with PostProber content creation"""
 
-    llm = setup_ai_model()
+    llm = setup_ai_model(max_tokens=300)
 
     # Simulating a PostProber user request
     user_topic = "launching a new mobile app"
@@ -119,7 +205,7 @@ if __name__ == "__main__":
 
     # Example 2: Different prompt types
     print("\n📖 Example 2: Different Prompt Types")
-    different_prompt_examples()
+    asyncio.run(different_prompt_examples())
 
     # Example 3: PostProber context
     print("\n📖 Example 3: PostProber Content Helper")
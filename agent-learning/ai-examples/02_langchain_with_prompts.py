@@ -15,31 +15,93 @@ Key Concepts:
 """
 
 from langchain_openai import ChatOpenAI
+from openai import OpenAI
 from langchain.prompts import ChatPromptTemplate, PromptTemplate
 from langchain.schema.output_parser import StrOutputParser
-from langchain.schema.runnable import RunnableLambda
+from langchain.schema.runnable import RunnableLambda, RunnableParallel
+from langchain_community.cache import SQLiteCache
+from langchain.globals import set_llm_cache
+import functools
+import json
+import time
+from operator import itemgetter
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from PostProber .env file
-load_dotenv(dotenv_path="../../.env")
+# (skipped when the key is already set, e.g. injected by CI or a container)
+if "OPENAI_API_KEY" not in os.environ:
+    load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env")
 
-def setup_ai_model():
+# Answer repeated prompts from a local cache (see lesson 1)
+set_llm_cache(SQLiteCache(database_path=".langchain.db"))
+
+# Model is configurable from .env (same as lesson 1)
+MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+@functools.lru_cache(maxsize=None)
+def setup_ai_model(max_tokens=500):
     """Set up the AI model (same as lesson 1)"""
     return ChatOpenAI(
-        model="gpt-4.1",
+        model=MODEL,
         temperature=0.9,
-        max_tokens=500
+        max_tokens=max_tokens
     )
 
-# 📖 LESSON: Creating your first prompt template
-def basic_prompt_template():
-    """Learn how to create and use prompt templates"""
+# Roles used by LangChain messages -> roles used by the OpenAI API
+_OPENAI_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+def to_openai_messages(template, inputs):
+    """Render a chat template into plain OpenAI chat messages"""
+    return [
+        {"role": _OPENAI_ROLES[message.type], "content": message.content}
+        for message in template.format_messages(**inputs)
+    ]
+
+def run_batch_job(conversations, max_tokens=500):
+    """Run chat conversations through the OpenAI Batch API (same as lesson 1)"""
+
+    client = OpenAI()
+
+    lines = [
+        json.dumps({
+            "custom_id": f"request-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": MODEL, "temperature": 0.9, "max_tokens": max_tokens, "messages": messages}
+        })
+        for i, messages in enumerate(conversations)
+    ]
+    batch_file = client.files.create(file=("batch.jsonl", "\n".join(lines).encode()), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
 
-    llm = setup_ai_model()
+    print(f"⏳ Batch {batch.id} submitted, waiting for results...")
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(30)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} finished with status: {batch.status}")
+
+    replies = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        item = json.loads(line)
+        if item.get("response") and item["response"]["status_code"] == 200:
+            replies[item["custom_id"]] = item["response"]["body"]["choices"][0]["message"]["content"]
 
-    # Instead of manually formatting strings, use PromptTemplate
-    template = """
+    return [replies.get(f"request-{i}", "❌ No result") for i in range(len(conversations))]
+
+# 📖 LESSON: Creating your first prompt template
+# Instead of manually formatting strings, use PromptTemplate.
+# Templates are built once at import and reused on every call.
+BASIC_POST_TEMPLATE = PromptTemplate(
+    input_variables=["platform", "topic", "tone", "audience", "char_limit"],
+    template="""
     You are a social media expert helping with content creation.
 
     Task: Create a {platform} post about {topic}
@@ -53,12 +115,12 @@ def basic_prompt_template():
 
     Post:
     """
+)
 
-    # Create the prompt template
-    prompt = PromptTemplate(
-        input_variables=["platform", "topic", "tone", "audience", "char_limit"],
-        template=template
-    )
+def basic_prompt_template():
+    """Learn how to create and use prompt templates"""
+
+    llm = setup_ai_model(max_tokens=150)
 
     # Example inputs
     inputs = {
@@ -70,7 +132,7 @@ def basic_prompt_template():
     }
 
     # Format the prompt with your inputs
-    formatted_prompt = prompt.format(**inputs)
+    formatted_prompt = BASIC_POST_TEMPLATE.format(**inputs)
     print("📝 Formatted Prompt:")
     print(formatted_prompt)
     print("\n" + "="*50 + "\n")
@@ -81,16 +143,16 @@ def basic_prompt_template():
     print(response.content)
 
 # 📖 LESSON: Chat templates (better for conversations)
+# Chat templates support system/user/assistant messages
+CHAT_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("system", "You are PostProber AI, an expert social media assistant. You help users create engaging content for {platform}."),
+    ("human", "I want to create a post about {topic}. My brand voice is {brand_voice}. Please suggest a post and explain why it would work well."),
+])
+
 def chat_prompt_template():
     """Learn about chat templates for more natural conversations"""
 
-    llm = setup_ai_model()
-
-    # Chat templates support system/user/assistant messages
-    chat_template = ChatPromptTemplate.from_messages([
-        ("system", "You are PostProber AI, an expert social media assistant. You help users create engaging content for {platform}."),
-        ("human", "I want to create a post about {topic}. My brand voice is {brand_voice}. Please suggest a post and explain why it would work well."),
-    ])
+    llm = setup_ai_model(max_tokens=300)
 
     # Create inputs
     inputs = {
@@ -100,7 +162,7 @@ def chat_prompt_template():
     }
 
     # Create the chain: template -> llm -> output parser
-    chain = chat_template | llm | StrOutputParser()
+    chain = CHAT_TEMPLATE | llm | StrOutputParser()
 
     # Run the chain
     response = chain.invoke(inputs)
@@ -109,142 +171,160 @@ def chat_prompt_template():
     print(response)
 
 # 📖 LESSON: Multiple prompt templates for different tasks
+# Template 1: Content Creation
+CONTENT_CREATION_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("system", "You are a content creation expert. Create engaging social media posts."),
+    ("human", """
+    Create a {platform} post about: {topic}
+    Brand voice: {brand_voice}
+    Call-to-action: {cta}
+    Include: {special_requirements}
+    """),
+])
+
+# Template 2: Hashtag Generation
+HASHTAG_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("system", "You are a hashtag expert. Generate relevant, trending hashtags."),
+    ("human", """
+    Generate 5-8 hashtags for this {platform} post:
+    "{post_content}"
+
+    Target audience: {audience}
+    Industry: {industry}
+
+    Mix of:
+    - 2-3 popular hashtags (high volume)
+    - 3-4 niche hashtags (targeted)
+    - 1-2 branded hashtags
+    """),
+])
+
+# Template 3: Post Optimization
+OPTIMIZATION_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("system", "You are a social media optimization expert. Improve posts for better engagement."),
+    ("human", """
+    Original post: "{original_post}"
+    Platform: {platform}
+    Issues: {issues}
+
+    Please provide:
+    1. Improved version
+    2. Explanation of changes
+    3. Expected engagement improvement
+    """),
+])
+
 def postprober_prompt_library():
     """Create a library of prompt templates for different PostProber features"""
 
-    llm = setup_ai_model()
-
-    # Template 1: Content Creation
-    content_creation_template = ChatPromptTemplate.from_messages([
-        ("system", "You are a content creation expert. Create engaging social media posts."),
-        ("human", """
-        Create a {platform} post about: {topic}
-        Brand voice: {brand_voice}
-        Call-to-action: {cta}
-        Include: {special_requirements}
-        """),
-    ])
-
-    # Template 2: Hashtag Generation
-    hashtag_template = ChatPromptTemplate.from_messages([
-        ("system", "You are a hashtag expert. Generate relevant, trending hashtags."),
-        ("human", """
-        Generate 5-8 hashtags for this {platform} post:
-        "{post_content}"
-
-        Target audience: {audience}
-        Industry: {industry}
-
-        Mix of:
-        - 2-3 popular hashtags (high volume)
-        - 3-4 niche hashtags (targeted)
-        - 1-2 branded hashtags
-        """),
-    ])
-
-    # Template 3: Post Optimization
-    optimization_template = ChatPromptTemplate.from_messages([
-        ("system", "You are a social media optimization expert. Improve posts for better engagement."),
-        ("human", """
-        Original post: "{original_post}"
-        Platform: {platform}
-        Issues: {issues}
-
-        Please provide:
-        1. Improved version
-        2. Explanation of changes
-        3. Expected engagement improvement
-        """),
-    ])
+    llm = setup_ai_model(max_tokens=300)
 
     # Example usage of each template
     print("📚 PostProber Prompt Library Examples:")
     print("="*50)
 
-    # Example 1: Content Creation
-    content_chain = content_creation_template | llm | StrOutputParser()
-    content_result = content_chain.invoke({
+    content_chain = CONTENT_CREATION_TEMPLATE | llm | StrOutputParser()
+    hashtag_chain = HASHTAG_TEMPLATE | llm | StrOutputParser()
+
+    inputs = {
+        # Example 1: Content Creation
         "platform": "Instagram",
         "topic": "morning coffee routine",
         "brand_voice": "cozy and authentic",
         "cta": "share your routine in comments",
-        "special_requirements": "mention our new coffee blend"
-    })
-
-    print("\n📝 Content Creation Example:")
-    print(content_result)
-
-    # Example 2: Hashtag Generation
-    hashtag_chain = hashtag_template | llm | StrOutputParser()
-    hashtag_result = hashtag_chain.invoke({
-        "platform": "Instagram",
+        "special_requirements": "mention our new coffee blend",
+        # Example 2: Hashtag Generation
         "post_content": "Starting my day with the perfect cup of coffee ☕ Our new Morning Blend is everything I needed!",
         "audience": "coffee enthusiasts and lifestyle bloggers",
         "industry": "coffee/beverage"
-    })
+    }
+
+    if os.getenv("USE_BATCH_API"):
+        # Not interactive, so the half-price Batch API is a good fit (see lesson 1)
+        content, hashtags = run_batch_job([
+            to_openai_messages(CONTENT_CREATION_TEMPLATE, inputs),
+            to_openai_messages(HASHTAG_TEMPLATE, inputs)
+        ], max_tokens=300)
+        results = {"content": content, "hashtags": hashtags}
+    else:
+        # The two chains don't depend on each other, so RunnableParallel runs them
+        # at the same time. Each template only reads the variables it needs.
+        library_chain = RunnableParallel(content=content_chain, hashtags=hashtag_chain)
+        results = library_chain.invoke(inputs)
+
+    print("\n📝 Content Creation Example:")
+    print(results["content"])
 
     print("\n🏷️ Hashtag Generation Example:")
-    print(hashtag_result)
+    print(results["hashtags"])
 
 # 📖 LESSON: Advanced prompt techniques
-def advanced_prompt_techniques():
-    """Learn advanced prompting techniques for better results"""
+# Technique 1: Few-shot prompting (giving examples)
+FEW_SHOT_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("system", "You are a social media expert. Create posts in the style of the examples."),
+    ("human", """
+    Here are examples of our brand voice:
 
-    llm = setup_ai_model()
+    Example 1: "Just dropped our latest feature! 🚀 It's like having a personal assistant for your social media. Who's ready to save 2 hours a day? #ProductivityHack"
 
-    # Technique 1: Few-shot prompting (giving examples)
-    few_shot_template = ChatPromptTemplate.from_messages([
-        ("system", "You are a social media expert. Create posts in the style of the examples."),
-        ("human", """
-        Here are examples of our brand voice:
+    Example 2: "Plot twist: The best social media strategy isn't posting more, it's posting smarter 🧠 Quality > Quantity, always. #SocialMediaTips"
 
-        Example 1: "Just dropped our latest feature! 🚀 It's like having a personal assistant for your social media. Who's ready to save 2 hours a day? #ProductivityHack"
+    Now create a similar post about: {topic}
+    """),
+])
 
-        Example 2: "Plot twist: The best social media strategy isn't posting more, it's posting smarter 🧠 Quality > Quantity, always. #SocialMediaTips"
+# Technique 2: Chain of thought prompting
+CHAIN_OF_THOUGHT_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("system", "You are a strategic social media planner. Think step by step."),
+    ("human", """
+    I need to create a {platform} post about {topic}.
 
-        Now create a similar post about: {topic}
-        """),
-    ])
+    Please think through this step by step:
+    1. What's the main goal of this post?
+    2. Who is the target audience?
+    3. What emotions should it evoke?
+    4. What action should readers take?
+    5. How can we make it platform-specific?
 
-    # Technique 2: Chain of thought prompting
-    chain_of_thought_template = ChatPromptTemplate.from_messages([
-        ("system", "You are a strategic social media planner. Think step by step."),
-        ("human", """
-        I need to create a {platform} post about {topic}.
+    Then create the post based on your analysis.
+    """),
+])
 
-        Please think through this step by step:
-        1. What's the main goal of this post?
-        2. Who is the target audience?
-        3. What emotions should it evoke?
-        4. What action should readers take?
-        5. How can we make it platform-specific?
+def advanced_prompt_techniques():
+    """Learn advanced prompting techniques for better results"""
 
-        Then create the post based on your analysis.
-        """),
-    ])
+    llm = setup_ai_model()
 
     # Test the techniques
     print("🧠 Advanced Prompt Techniques:")
     print("="*50)
 
-    # Few-shot example
-    few_shot_chain = few_shot_template | llm | StrOutputParser()
-    few_shot_result = few_shot_chain.invoke({
-        "topic": "time management for entrepreneurs"
+    few_shot_chain = FEW_SHOT_TEMPLATE | llm | StrOutputParser()
+    cot_chain = CHAIN_OF_THOUGHT_TEMPLATE | llm | StrOutputParser()
+
+    # Both techniques use a different {topic}, so give each branch its own
+    # inputs with itemgetter and run them in parallel
+    techniques_chain = RunnableParallel(
+        few_shot=itemgetter("few_shot") | few_shot_chain,
+        cot=itemgetter("cot") | cot_chain
+    )
+    results = techniques_chain.invoke({
+        # Few-shot example
+        "few_shot": {
+            "topic": "time management for entrepreneurs"
+        },
+        # Chain of thought example
+        "cot": {
+            "platform": "LinkedIn",
+            "topic": "the importance of work-life balance"
+        }
     })
 
     print("\n🎯 Few-shot Learning Example:")
-    print(few_shot_result)
-
-    # Chain of thought example
-    cot_chain = chain_of_thought_template | llm | StrOutputParser()
-    cot_result = cot_chain.invoke({
-        "platform": "LinkedIn",
-        "topic": "the importance of work-life balance"
-    })
+    print(results["few_shot"])
 
     print("\n🧠 Chain of Thought Example:")
-    print(cot_result)
+    print(results["cot"])
 
 if __name__ == "__main__":
     print("🚀 Welcome to LangChain Prompt Templates!")
@@ -18,112 +18,207 @@ from langchain_openai import ChatOpenAI
 from langchain.tools import tool
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.output_parser import StrOutputParser
-from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain_community.cache import SQLiteCache
+from langchain.globals import set_llm_cache
+from langchain_core.rate_limiters import InMemoryRateLimiter
+import asyncio
+import functools
 import json
 import random
+import re
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from PostProber .env file
-load_dotenv(dotenv_path="../../.env")
-
+# (skipped when the key is already set, e.g. injected by CI or a container)
+if "OPENAI_API_KEY" not in os.environ:
+    load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env")
+
+# Answer repeated prompts from a local cache (see lesson 1)
+set_llm_cache(SQLiteCache(database_path=".langchain.db"))
+
+# Keep concurrent agents under OpenAI's rate limits (see lesson 1)
+OPENAI_QPM = int(os.getenv("OPENAI_QPM", "500"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "20"))
+RATE_LIMITER = InMemoryRateLimiter(
+    requests_per_second=OPENAI_QPM / 60,
+    max_bucket_size=OPENAI_MAX_CONCURRENCY
+)
+
+@functools.lru_cache(maxsize=1)
 def setup_ai_model():
     """Set up the AI model (same as previous lessons)"""
     return ChatOpenAI(
         model="gpt-3.5-turbo",
         temperature=0.7,
-        max_tokens=1000
+        max_tokens=1000,
+        stream_usage=True,  # Report token usage on streamed responses too
+        rate_limiter=RATE_LIMITER
     )
 
+# 📖 LESSON: Keeping system prompts static
+# The agent resends its system prompt on every turn of the tool loop. OpenAI
+# caches repeated prompt prefixes automatically, so keep these strings
+# byte-identical between calls and put the per-request parts ({input} and the
+# scratchpad) after them.
+BASIC_AGENT_SYSTEM_PROMPT = """You are PostProber AI, a helpful social media assistant.
+You have access to several tools to help users with their social media content.
+Use these tools when they would be helpful to answer the user's question.
+
+Available tools:
+- get_current_time: Get the current date and time
+- count_characters: Count characters in text
+- generate_hashtags: Generate relevant hashtags for topics
+"""
+
+POSTPROBER_AGENT_SYSTEM_PROMPT = """You are PostProber AI, an expert social media management assistant.
+
+Your mission: Help users create, optimize, and schedule amazing social media content.
+
+You have access to these powerful tools:
+- get_current_time: Check current date/time for scheduling
+- count_characters: Verify content fits platform limits
+- generate_hashtags: Create relevant hashtags
+- check_posting_schedule: Analyze if posting time is optimal
+- analyze_content_sentiment: Understand content tone and sentiment
+
+Always be helpful, professional, and provide actionable advice.
+When suggesting improvements, explain why they would work better.
+When a request needs several tools that don't depend on each other's results,
+call them all in the same step instead of one at a time.
+"""
+
+CUSTOM_TOOLS_SYSTEM_PROMPT = """You are PostProber's advanced AI assistant with access to user data and scheduling capabilities.
+
+You can:
+- Check user analytics and performance
+- Schedule posts for future publishing
+- Get trending topics for any platform
+
+Always provide helpful, data-driven recommendations.
+"""
+
+# 📖 LESSON: Lookup tables live at module level
+# Tools can be called many times inside one agent run, so build their
+# keyword tables once instead of on every call.
+_BASE_HASHTAGS = {
+    "coffee": ("#Coffee", "#MorningBrew", "#CoffeeLovers", "#Barista", "#CoffeeTime"),
+    "technology": ("#Tech", "#Innovation", "#Digital", "#Future", "#TechTrends"),
+    "fitness": ("#Fitness", "#Workout", "#HealthyLifestyle", "#GymLife", "#FitnessTips"),
+    "food": ("#Food", "#Foodie", "#Delicious", "#Cooking", "#Recipe")
+}
+# One compiled pattern finds any topic keyword in a single scan of the text
+_HASHTAG_TOPIC_RE = re.compile("|".join(map(re.escape, _BASE_HASHTAGS)))
+
+_POSITIVE_WORDS = frozenset({"great", "awesome", "love", "amazing", "excellent", "fantastic", "wonderful"})
+_NEGATIVE_WORDS = frozenset({"bad", "terrible", "hate", "awful", "horrible", "worst"})
+_PROFESSIONAL_WORDS = frozenset({"strategy", "growth", "optimization", "efficiency", "professional"})
+_WORD_RE = re.compile(r"[a-z']+")
+
+# Matches "How many characters are in ...: '<text>'" style questions
+_CHAR_COUNT_QUERY_RE = re.compile(r"how many characters.*?'(.*)'", re.IGNORECASE | re.DOTALL)
+
+_TRENDING_TOPICS = {
+    "twitter": ("#AI", "#Tech", "#Productivity", "#Remote Work", "#Startup"),
+    "linkedin": ("#Leadership", "#Career", "#Professional Development", "#Industry Insights", "#Networking"),
+    "instagram": ("#Lifestyle", "#Motivation", "#BehindTheScenes", "#Community", "#Inspiration")
+}
+
+# Optimal posting times (simplified examples)
+_OPTIMAL_TIMES = {
+    "twitter": {
+        "weekday_hours": frozenset({9, 12, 17}),  # 9am, 12pm, 5pm
+        "weekend_hours": frozenset({10, 14})      # 10am, 2pm
+    },
+    "linkedin": {
+        "weekday_hours": frozenset({8, 12, 17}),  # 8am, 12pm, 5pm
+        "weekend_hours": frozenset()              # Not recommended
+    },
+    "instagram": {
+        "weekday_hours": frozenset({11, 14, 17}), # 11am, 2pm, 5pm
+        "weekend_hours": frozenset({10, 13})      # 10am, 1pm
+    }
+}
+_DEFAULT_OPTIMAL_TIMES = {"weekday_hours": frozenset({12}), "weekend_hours": frozenset({12})}
+
+# Mock analytics come from one seeded generator, so every run of the lesson
+# produces the same numbers (and the same prompts, which the LLM cache can reuse)
+_MOCK_RNG = random.Random(42)
+
+# 📖 LESSON: Keeping tool results small
+# Tool results are sent back to the model as text, so every character costs
+# tokens. Return compact JSON and leave out fields the model already knows
+# (like values it just passed in as arguments).
+def to_observation(data) -> str:
+    """Serialize a tool result as compact JSON for the agent"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
 # 📖 LESSON: Creating your first tool
+# These tools are used by the async agents below, so they are coroutines:
+# LangChain awaits them directly instead of handing each call to a thread.
 @tool
-def get_current_time() -> str:
+async def get_current_time() -> str:
     """Get the current date and time. Useful for scheduling posts or time-sensitive content."""
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 @tool
-def count_characters(text: str) -> int:
+async def count_characters(text: str) -> int:
     """Count the number of characters in a text. Useful for platform character limits."""
     return len(text)
 
 @tool
-def generate_hashtags(topic: str, count: int = 5) -> List[str]:
+async def generate_hashtags(topic: str, count: int = 5) -> List[str]:
     """Generate hashtags for a given topic. Returns a list of relevant hashtags."""
     # This is a simple example - in real PostProber, this would use trending data
-    base_hashtags = {
-        "coffee": ["#Coffee", "#MorningBrew", "#CoffeeLovers", "#Barista", "#CoffeeTime"],
-        "technology": ["#Tech", "#Innovation", "#Digital", "#Future", "#TechTrends"],
-        "fitness": ["#Fitness", "#Workout", "#HealthyLifestyle", "#GymLife", "#FitnessTips"],
-        "food": ["#Food", "#Foodie", "#Delicious", "#Cooking", "#Recipe"]
-    }
-
     # Simple matching logic (in real app, this would be much more sophisticated)
-    for key, tags in base_hashtags.items():
-        if key.lower() in topic.lower():
-            return tags[:count]
+    match = _HASHTAG_TOPIC_RE.search(topic.lower())
+    if match:
+        return list(_BASE_HASHTAGS[match.group()][:count])
 
     # Generic hashtags if no match
     return [f"#{topic.title()}", "#SocialMedia", "#Content", "#Engagement", "#PostProber"]
 
 # 📖 LESSON: More sophisticated PostProber tools
 @tool
-def check_posting_schedule(platform: str, datetime_str: str) -> Dict:
+async def check_posting_schedule(platform: str, datetime_str: str) -> str:
     """Check if a posting time is optimal for a given platform."""
     try:
-        post_time = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
+        # fromisoformat is much cheaper than strptime and accepts "YYYY-MM-DD HH:MM:SS"
+        post_time = datetime.fromisoformat(datetime_str)
         hour = post_time.hour
         day_of_week = post_time.weekday()  # 0 = Monday, 6 = Sunday
 
-        # Optimal posting times (simplified examples)
-        optimal_times = {
-            "twitter": {
-                "weekday_hours": [9, 12, 17],  # 9am, 12pm, 5pm
-                "weekend_hours": [10, 14]      # 10am, 2pm
-            },
-            "linkedin": {
-                "weekday_hours": [8, 12, 17],  # 8am, 12pm, 5pm
-                "weekend_hours": []             # Not recommended
-            },
-            "instagram": {
-                "weekday_hours": [11, 14, 17], # 11am, 2pm, 5pm
-                "weekend_hours": [10, 13]      # 10am, 1pm
-            }
-        }
-
-        platform_times = optimal_times.get(platform.lower(), {"weekday_hours": [12], "weekend_hours": [12]})
+        platform_times = _OPTIMAL_TIMES.get(platform.lower(), _DEFAULT_OPTIMAL_TIMES)
 
         is_weekend = day_of_week >= 5
         optimal_hours = platform_times["weekend_hours"] if is_weekend else platform_times["weekday_hours"]
 
         is_optimal = hour in optimal_hours
 
-        return {
+        return to_observation({
             "is_optimal": is_optimal,
-            "current_hour": hour,
-            "optimal_hours": optimal_hours,
+            "optimal_hours": sorted(optimal_hours),
             "day_type": "weekend" if is_weekend else "weekday",
-            "platform": platform,
             "recommendation": f"{'Good' if is_optimal else 'Consider'} time for {platform}"
-        }
+        })
 
     except ValueError:
-        return {"error": "Invalid datetime format. Use YYYY-MM-DD HH:MM:SS"}
+        return to_observation({"error": "Invalid datetime format. Use YYYY-MM-DD HH:MM:SS"})
 
 @tool
-def analyze_content_sentiment(text: str) -> Dict:
+async def analyze_content_sentiment(text: str) -> str:
     """Analyze the sentiment and tone of content."""
     # Simplified sentiment analysis (in real app, use proper NLP libraries)
-    positive_words = ["great", "awesome", "love", "amazing", "excellent", "fantastic", "wonderful"]
-    negative_words = ["bad", "terrible", "hate", "awful", "horrible", "worst"]
-    professional_words = ["strategy", "growth", "optimization", "efficiency", "professional"]
+    # Tokenize once, then each keyword table is a single set intersection
+    words = set(_WORD_RE.findall(text.lower()))
 
-    text_lower = text.lower()
-
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
-    professional_count = sum(1 for word in professional_words if word in text_lower)
+    positive_count = len(words & _POSITIVE_WORDS)
+    negative_count = len(words & _NEGATIVE_WORDS)
+    professional_count = len(words & _PROFESSIONAL_WORDS)
 
     if positive_count > negative_count:
         sentiment = "positive"
@@ -134,17 +229,17 @@ def analyze_content_sentiment(text: str) -> Dict:
 
     tone = "professional" if professional_count > 2 else "casual"
 
-    return {
+    return to_observation({
         "sentiment": sentiment,
         "tone": tone,
         "word_count": len(text.split()),
         "character_count": len(text),
         "positive_indicators": positive_count,
         "professional_indicators": professional_count
-    }
+    })
 
 # 📖 LESSON: Using tools with AI agents
-def basic_tool_usage():
+async def basic_tool_usage():
     """Learn how to use tools with AI"""
 
     llm = setup_ai_model()
@@ -154,21 +249,13 @@ def basic_tool_usage():
 
     # Create a prompt that knows about tools
     prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are PostProber AI, a helpful social media assistant.
-        You have access to several tools to help users with their social media content.
-        Use these tools when they would be helpful to answer the user's question.
-
-        Available tools:
-        - get_current_time: Get the current date and time
-        - count_characters: Count characters in text
-        - generate_hashtags: Generate relevant hashtags for topics
-        """),
+        ("system", BASIC_AGENT_SYSTEM_PROMPT),
         ("human", "{input}"),
         ("placeholder", "{agent_scratchpad}"),
     ])
 
     # Create an agent that can use tools
-    agent = create_openai_functions_agent(llm, tools, prompt)
+    agent = create_tool_calling_agent(llm, tools, prompt)
     agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
 
     # Test with different queries
@@ -179,20 +266,68 @@ def basic_tool_usage():
         "I want to post about coffee at the best time. What time is it now and give me some hashtags?"
     ]
 
-    for i, query in enumerate(queries, 1):
+    semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+    async def answer(query):
+        # A character count is just len() - answer it directly instead of
+        # paying for an LLM round-trip to decide to call count_characters
+        match = _CHAR_COUNT_QUERY_RE.search(query)
+        if match:
+            return {"output": f"That text is {len(match.group(1))} characters long."}
+        async with semaphore:
+            return await agent_executor.ainvoke({"input": query})
+
+    # Each query is independent, so run them concurrently and print in order
+    results = await asyncio.gather(
+        *[answer(query) for query in queries],
+        return_exceptions=True
+    )
+
+    for i, (query, result) in enumerate(zip(queries, results), 1):
         print(f"\n--- Query {i} ---")
         print(f"🤔 User: {query}")
 
-        try:
-            result = agent_executor.invoke({"input": query})
+        if isinstance(result, Exception):
+            print(f"❌ Error: {result}")
+        else:
             print(f"🤖 AI: {result['output']}")
-        except Exception as e:
-            print(f"❌ Error: {e}")
 
         print("-" * 50)
 
+# 📖 LESSON: Streaming agent output
+async def streaming_tool_usage():
+    """Print the agent's answer token by token as it is generated"""
+
+    llm = setup_ai_model()
+    tools = [get_current_time, count_characters, generate_hashtags]
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", BASIC_AGENT_SYSTEM_PROMPT),
+        ("human", "{input}"),
+        ("placeholder", "{agent_scratchpad}"),
+    ])
+
+    agent = create_tool_calling_agent(llm, tools, prompt)
+    agent_executor = AgentExecutor(agent=agent, tools=tools)
+
+    query = "I want to post about coffee at the best time. What time is it now and give me some hashtags?"
+    print(f"🤔 User: {query}")
+    print("🤖 AI: ", end="", flush=True)
+
+    # astream_events reports every step of the run; the chat model stream
+    # events carry the text tokens as soon as OpenAI sends them
+    async for event in agent_executor.astream_events({"input": query}, version="v2"):
+        if event["event"] == "on_chat_model_stream":
+            content = event["data"]["chunk"].content
+            if content:
+                print(content, end="", flush=True)
+        elif event["event"] == "on_tool_start":
+            print(f"\n🔧 Using tool: {event['name']}", flush=True)
+
+    print("\n" + "-" * 50)
+
 # 📖 LESSON: Advanced PostProber tool integration
-def postprober_agent_example():
+async def postprober_agent_example():
     """A more realistic PostProber agent with multiple tools"""
 
     llm = setup_ai_model()
@@ -207,25 +342,15 @@ def postprober_agent_example():
     ]
 
     prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are PostProber AI, an expert social media management assistant.
-
-        Your mission: Help users create, optimize, and schedule amazing social media content.
-
-        You have access to these powerful tools:
-        - get_current_time: Check current date/time for scheduling
-        - count_characters: Verify content fits platform limits
-        - generate_hashtags: Create relevant hashtags
-        - check_posting_schedule: Analyze if posting time is optimal
-        - analyze_content_sentiment: Understand content tone and sentiment
-
-        Always be helpful, professional, and provide actionable advice.
-        When suggesting improvements, explain why they would work better.
-        """),
+        ("system", POSTPROBER_AGENT_SYSTEM_PROMPT),
         ("human", "{input}"),
         ("placeholder", "{agent_scratchpad}"),
     ])
 
-    agent = create_openai_functions_agent(llm, tools, prompt)
+    # OpenAI can return several tool calls in one response (e.g. sentiment and
+    # hashtags for the same post). With ainvoke, AgentExecutor runs those
+    # calls concurrently, so one turn costs one round-trip instead of two.
+    agent = create_tool_calling_agent(llm, tools, prompt)
     agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
 
     # Realistic PostProber scenarios
@@ -237,16 +362,26 @@ def postprober_agent_example():
         "I'm planning to post about coffee recipes on Instagram at 2024-12-25 15:30:00. Is that a good time? Also generate hashtags for coffee content."
     ]
 
-    for i, scenario in enumerate(scenarios, 1):
+    semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+    async def run_scenario(scenario):
+        async with semaphore:
+            return await agent_executor.ainvoke({"input": scenario})
+
+    print("🤖 PostProber AI is thinking...")
+    results = await asyncio.gather(
+        *[run_scenario(scenario) for scenario in scenarios],
+        return_exceptions=True
+    )
+
+    for i, (scenario, result) in enumerate(zip(scenarios, results), 1):
         print(f"\n🎯 Scenario {i}")
         print(f"👤 User: {scenario}")
-        print("🤖 PostProber AI is thinking...")
 
-        try:
-            result = agent_executor.invoke({"input": scenario})
+        if isinstance(result, Exception):
+            print(f"❌ Error: {result}")
+        else:
             print(f"✨ Result:\n{result['output']}")
-        except Exception as e:
-            print(f"❌ Error: {e}")
 
         print("=" * 60)
 
@@ -255,62 +390,44 @@ def create_custom_postprober_tools():
     """Learn how to create tools specific to your application"""
 
     @tool
-    def get_user_analytics(user_id: str, days: int = 7) -> Dict:
+    def get_user_analytics(user_id: str, days: int = 7) -> str:
         """Get user's posting analytics for the last N days."""
         # In real PostProber, this would query your database
-        return {
-            "user_id": user_id,
-            "period_days": days,
-            "total_posts": random.randint(5, 20),
-            "total_engagement": random.randint(100, 1000),
-            "avg_engagement_rate": round(random.uniform(2.0, 8.5), 2),
-            "best_performing_platform": random.choice(["Twitter", "LinkedIn", "Instagram"]),
+        return to_observation({
+            "total_posts": _MOCK_RNG.randint(5, 20),
+            "total_engagement": _MOCK_RNG.randint(100, 1000),
+            "avg_engagement_rate": round(_MOCK_RNG.uniform(2.0, 8.5), 2),
+            "best_performing_platform": _MOCK_RNG.choice(["Twitter", "LinkedIn", "Instagram"]),
             "suggestion": "Your engagement rate is above average! Consider posting more frequently on your best-performing platform."
-        }
+        })
 
     @tool
-    def schedule_post(content: str, platform: str, schedule_time: str) -> Dict:
+    def schedule_post(content: str, platform: str, schedule_time: str) -> str:
         """Schedule a post for future publishing."""
         # In real PostProber, this would save to your scheduling system
-        return {
+        return to_observation({
             "status": "scheduled",
-            "post_id": f"post_{random.randint(1000, 9999)}",
-            "content": content,
-            "platform": platform,
-            "scheduled_for": schedule_time,
+            "post_id": f"post_{_MOCK_RNG.randint(1000, 9999)}",
             "message": f"✅ Post scheduled for {platform} at {schedule_time}"
-        }
+        })
 
     @tool
     def get_trending_topics(platform: str, category: str = "general") -> List[str]:
         """Get trending topics for a specific platform and category."""
         # In real PostProber, this would use platform APIs
-        trending_topics = {
-            "twitter": ["#AI", "#Tech", "#Productivity", "#Remote Work", "#Startup"],
-            "linkedin": ["#Leadership", "#Career", "#Professional Development", "#Industry Insights", "#Networking"],
-            "instagram": ["#Lifestyle", "#Motivation", "#BehindTheScenes", "#Community", "#Inspiration"]
-        }
-        return trending_topics.get(platform.lower(), ["#Trending", "#Popular", "#Now"])
+        return list(_TRENDING_TOPICS.get(platform.lower(), ("#Trending", "#Popular", "#Now")))
 
     # Test the custom tools
     llm = setup_ai_model()
     tools = [get_user_analytics, schedule_post, get_trending_topics]
 
     prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are PostProber's advanced AI assistant with access to user data and scheduling capabilities.
-
-        You can:
-        - Check user analytics and performance
-        - Schedule posts for future publishing
-        - Get trending topics for any platform
-
-        Always provide helpful, data-driven recommendations.
-        """),
+        ("system", CUSTOM_TOOLS_SYSTEM_PROMPT),
         ("human", "{input}"),
         ("placeholder", "{agent_scratchpad}"),
     ])
 
-    agent = create_openai_functions_agent(llm, tools, prompt)
+    agent = create_tool_calling_agent(llm, tools, prompt)
     agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
 
     # Test custom tools
@@ -335,17 +452,21 @@ if __name__ == "__main__":
     # Example 1: Basic tool usage
     print("\n📖 Example 1: Basic Tool Usage")
     try:
-        basic_tool_usage()
+        asyncio.run(basic_tool_usage())
     except Exception as e:
         print(f"❌ Error: {e}")
         print("💡 Tip: API key is loaded from PostProber .env file automatically")
 
-    # Example 2: Advanced PostProber agent
-    print("\n📖 Example 2: PostProber Agent with Tools")
-    # postprober_agent_example()
+    # Example 2: Streaming responses
+    print("\n📖 Example 2: Streaming Agent Output")
+    # asyncio.run(streaming_tool_usage())
+
+    # Example 3: Advanced PostProber agent
+    print("\n📖 Example 3: PostProber Agent with Tools")
+    # asyncio.run(postprober_agent_example())
 
-    # Example 3: Custom tools
-    print("\n📖 Example 3: Custom PostProber Tools")
+    # Example 4: Custom tools
+    print("\n📖 Example 4: Custom PostProber Tools")
     # create_custom_postprober_tools()
 
     print("\n🎉 Amazing! You now understand tools and function calling!")
@@ -15,298 +15,619 @@ Key Concepts:
 - Conditional routing: Making decisions in workflows
 """
 
-from typing import TypedDict, List, Optional
+from typing import Annotated, TypedDict, List, Optional
 from langgraph.graph import StateGraph, END
+from langgraph.types import CachePolicy
+from langgraph.cache.sqlite import SqliteCache
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.output_parser import StrOutputParser
+from langchain_community.cache import SQLiteCache
+from langchain.globals import set_llm_cache
+import asyncio
+import functools
 import json
+import logging
+import math
+import operator
 import os
+import uuid
+from pathlib import Path
+from types import MappingProxyType
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+try:
+    import tiktoken
+except ImportError:  # optional - token counts fall back to an estimate
+    tiktoken = None
+
+# Plain string helpers (truncation, hashtag parsing) live in their own
+# module so they can be compiled with mypyc - see post_utils.py
+from post_utils import compose_post, parse_hashtags, trim_to_limit, trim_to_sentences
+
+# Node progress goes through logging, so its messages are only formatted
+# when a handler will actually print them (see the __main__ block)
+logger = logging.getLogger(__name__)
+
 # Load environment variables from PostProber .env file
-load_dotenv(dotenv_path="../../.env")
+# (skipped when the key is already set, e.g. injected by CI or a container)
+if "OPENAI_API_KEY" not in os.environ:
+    load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env")
+
+# Repeated runs with the same inputs are answered from a local cache (only
+# the temperature 0 steps - see setup_ai_model)
+set_llm_cache(SQLiteCache(database_path=".langchain.db"))
+
+# LangGraph can also cache whole nodes, so a replayed node is skipped entirely
+NODE_CACHE = SqliteCache(path=".lg_cache.db")
+
+# Workflow checkpoints (state saved after every step) live in this database
+CHECKPOINT_DB = "post_creation.db"
 
 # 📖 LESSON: Defining State - The information that flows through your workflow
-class PostCreationState(TypedDict):
-    """State for our post creation workflow"""
-    # Input from user
+# Nodes get the state as a plain dict, which is the cheapest form LangGraph
+# can hand them (a Pydantic or dataclass state is rebuilt for every node
+# call). total=False lets a run start with only the user input: the other
+# keys appear as nodes fill them in, so there's less state to copy and
+# checkpoint at every step.
+class PostCreationInput(TypedDict):
+    """User input every workflow run starts with"""
     topic: str
     platform: str
     target_audience: str
 
+class PostCreationState(PostCreationInput, total=False):
+    """State for our post creation workflow"""
     # Generated during workflow
+    char_limit: int
     raw_content: Optional[str]
     optimized_content: Optional[str]
     hashtags: Optional[List[str]]
     character_count: Optional[int]
+    token_count: Optional[int]
     final_post: Optional[str]
 
     # Workflow control
     needs_optimization: Optional[bool]
-    errors: Optional[List[str]]
+    # Failures the workflow gave up on (see invoke_with_resume), appended in order
+    errors: Annotated[List[str], operator.add]
+
+MODEL = "gpt-3.5-turbo"
 
-def setup_ai_model():
-    """Set up the AI model"""
+@functools.lru_cache(maxsize=None)
+def setup_ai_model(temperature=0.7, max_tokens=None):
+    """Set up the AI model (one per temperature and output budget)"""
+    # Every instance reuses langchain-openai's shared HTTP connection pool
     return ChatOpenAI(
-        model="gpt-3.5-turbo",
-        temperature=0.7,
-        max_tokens=500
+        model=MODEL,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        # The LLM cache is global, so creative clients have to opt out of it
+        cache=False if temperature > 0 else None
     )
 
-# 📖 LESSON: Creating workflow nodes (functions that process state)
+# Platform character limits (read-only, shared by every run)
+PLATFORM_LIMITS = MappingProxyType({
+    "twitter": 280,
+    "linkedin": 3000,
+    "instagram": 2200,
+    "facebook": 63206
+})
+DEFAULT_CHAR_LIMIT = 280
+
+def platform_char_limit(platform: str) -> int:
+    """Look up a platform's character limit, falling back to the default"""
+    limit = PLATFORM_LIMITS.get(platform.strip().lower())
+    if limit is None:
+        logger.warning("⚠️ Unknown platform '%s' - using a %d character limit", platform, DEFAULT_CHAR_LIMIT)
+        return DEFAULT_CHAR_LIMIT
+    return limit
+
+# 📖 LESSON: Size the output budget to the platform
+# A tweet needs about 80 tokens and a LinkedIn post several hundred, so
+# max_tokens is set per platform instead of one fixed cap. CHARS_PER_TOKEN
+# is a little below the usual ~4 for English, which leaves some headroom.
+CHARS_PER_TOKEN = 3.5
+MAX_OUTPUT_TOKENS = 1000
+HASHTAG_MAX_TOKENS = 60
+
+def output_token_budget(char_limit: float) -> int:
+    """Output tokens needed for roughly char_limit characters of text"""
+    return min(MAX_OUTPUT_TOKENS, math.ceil(char_limit / CHARS_PER_TOKEN))
+
+# Once there is real content, tiktoken can count its tokens exactly. The
+# encoding is loaded once (the first load downloads it), and if it can't be
+# loaded the character estimate above is used instead.
+@functools.lru_cache(maxsize=None)
+def token_encoding():
+    """The model's tokenizer, or None when tiktoken isn't available"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(MODEL)
+    except Exception as e:
+        logger.warning("⚠️ Couldn't load the tiktoken encoding (%s) - estimating token counts", e)
+        return None
+
+def count_tokens(text: str) -> int:
+    """Count the tokens in text (estimated if tiktoken isn't available)"""
+    encoding = token_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+# Content that is only slightly over the limit is trimmed locally at a
+# sentence boundary, as long as the trim keeps most of the post. Anything
+# harder goes to the optimize node's LLM call.
+LOCAL_TRIM_MAX_OVERSHOOT = 1.15
+LOCAL_TRIM_MIN_KEEP = 0.7
+
+# An optimized post this far over the limit has already failed, so the
+# stream is stopped there instead of paying for the rest of the tokens
+OPTIMIZE_ABORT_RATIO = 1.5
+
+# 📖 LESSON: Prompt templates are built once and reused by every workflow run
+# The system messages hold all the fixed instructions and never change, while
+# the per-request values come last. Providers cache repeated prompt prefixes,
+# so keeping the start of every prompt identical makes those cache hits likely.
+GENERATE_CONTENT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a social media content creator. Create engaging posts.
+
+    Make each post engaging and appropriate for its platform.
+    Don't include hashtags yet - just the main content.
+    """),
+    ("human", """
+    Platform: {platform}
+    Topic: {topic}
+    Target audience: {target_audience}
+    """)
+])
+
+OPTIMIZE_CONTENT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a social media optimization expert. Make content better and shorter.
+
+    Optimize the post you are given while keeping it engaging. Make it:
+    - Under the character limit
+    - More engaging and punchy
+    - Platform-appropriate
+    - Maintain the key message
+    """),
+    ("human", """
+    Platform: {platform}
+    Character limit: {char_limit}
+
+    Original content:
+    {original_content}
+    """)
+])
+
+GENERATE_HASHTAGS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a hashtag expert. Generate relevant, trending hashtags.
+
+    Generate 5-8 relevant hashtags for the post you are given.
+    Return only the hashtags, separated by spaces.
+    Mix popular and niche hashtags.
+    """),
+    ("human", """
+    Platform: {platform}
+    Topic: {topic}
+    Target audience: {target_audience}
+
+    Post:
+    "{content}"
+    """)
+])
+
+# 📖 LESSON: Chains are built once and shared by every run
+# Piping a prompt into a model builds a new runnable each time, so each chain
+# is built on first use and then reused. Building lazily instead of at import
+# keeps the module importable before OPENAI_API_KEY is set.
+# A chain is built for each output budget, so each platform gets its own.
+@functools.lru_cache(maxsize=None)
+def generate_content_chain(max_tokens: int):
+    """Chain for generate_content_node"""
+    return GENERATE_CONTENT_PROMPT | setup_ai_model(max_tokens=max_tokens) | StrOutputParser()
+
+@functools.lru_cache(maxsize=None)
+def optimize_content_chain(max_tokens: int):
+    """Chain for optimize_content_node"""
+    # Optimizing is an editing task, so a deterministic model (and cacheable
+    # answer) is better here than a creative one
+    return (
+        OPTIMIZE_CONTENT_PROMPT
+        | setup_ai_model(temperature=0, max_tokens=max_tokens)
+        | StrOutputParser()
+    )
 
-def generate_content_node(state: PostCreationState) -> PostCreationState:
-    """Node 1: Generate initial content based on user input"""
-    print(f"📝 Generating content for {state['platform']} about {state['topic']}...")
+@functools.lru_cache(maxsize=None)
+def generate_hashtags_chain():
+    """Chain for generate_hashtags_node"""
+    return (
+        GENERATE_HASHTAGS_PROMPT
+        | setup_ai_model(temperature=0, max_tokens=HASHTAG_MAX_TOKENS)
+        | StrOutputParser()
+    )
+
+# 📖 LESSON: Node-level caching
+# A cache policy tells LangGraph to store a node's update and reuse it when the
+# node sees the same key again. The key only uses the state fields the node
+# actually reads, so unrelated changes elsewhere in the state still hit the
+# cache. Only the LLM nodes get a policy: the length check and finalize step
+# are cheaper to rerun than a cache lookup. A node that raises is never
+# cached, so the LLM nodes raise on failure instead of returning an error
+# update that would be replayed for the next hour.
+NODE_CACHE_TTL = 3600  # seconds
 
-    llm = setup_ai_model()
+def cache_policy_for(*fields: str) -> CachePolicy:
+    """Build a cache policy keyed on just the given state fields"""
+    def key_func(state: PostCreationState) -> str:
+        return json.dumps([state.get(field) for field in fields])
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a social media content creator. Create engaging posts."),
-        ("human", """
-        Create a {platform} post about: {topic}
-        Target audience: {target_audience}
+    return CachePolicy(key_func=key_func, ttl=NODE_CACHE_TTL)
 
-        Make it engaging and appropriate for the platform.
-        Don't include hashtags yet - just the main content.
-        """)
-    ])
+# 📖 LESSON: Creating workflow nodes (functions that process state)
+# The LLM nodes are async, so while one waits on OpenAI the other parallel
+# branch keeps running. Each node returns only the keys it changed. LangGraph merges that update
+# into the shared state, which is what lets two nodes run side by side
+# without overwriting each other's results.
 
-    chain = prompt | llm | StrOutputParser()
+async def generate_content_node(state: PostCreationState) -> dict:
+    """Node 1: Generate initial content based on user input"""
+    logger.info("📝 Generating content for %s about %s...", state["platform"], state["topic"])
+
+    # The entry node looks the limit up once, later nodes read it from state
+    limit = platform_char_limit(state["platform"])
+    # The first draft may run long (that's what the optimize step is for),
+    # but past the optimizer's abort point the extra text would be wasted
+    max_tokens = output_token_budget(limit * OPTIMIZE_ABORT_RATIO)
 
     try:
-        raw_content = chain.invoke({
+        raw_content = (await generate_content_chain(max_tokens).ainvoke({
             "platform": state["platform"],
             "topic": state["topic"],
             "target_audience": state["target_audience"]
-        })
+        })).strip()
 
-        # Update state with generated content
-        state["raw_content"] = raw_content.strip()
-        state["character_count"] = len(state["raw_content"])
+        logger.info("✅ Generated content: %.50s...", raw_content)
 
-        print(f"✅ Generated content: {state['raw_content'][:50]}...")
+        # Update state with generated content
+        return {
+            "char_limit": limit,
+            "raw_content": raw_content,
+            "character_count": len(raw_content)
+        }
 
     except Exception as e:
-        state["errors"] = state.get("errors", []) + [f"Content generation error: {str(e)}"]
-        print(f"❌ Error generating content: {e}")
-
-    return state
+        logger.error("❌ Error generating content: %s", e)
+        raise RuntimeError(f"Content generation error: {str(e)}") from e
 
-def check_optimization_needed_node(state: PostCreationState) -> PostCreationState:
+def check_optimization_needed_node(state: PostCreationState) -> dict:
     """Node 2: Check if content needs optimization"""
-    print("🔍 Checking if optimization is needed...")
+    logger.info("🔍 Checking if optimization is needed...")
 
-    # Platform character limits
-    platform_limits = {
-        "twitter": 280,
-        "linkedin": 3000,
-        "instagram": 2200,
-        "facebook": 63206
-    }
-
-    limit = platform_limits.get(state["platform"].lower(), 280)
-    character_count = state.get("character_count", 0)
+    limit = state["char_limit"]
+    character_count = state.get("character_count") or 0
 
     # Determine if optimization is needed
     needs_optimization = character_count > limit
 
-    state["needs_optimization"] = needs_optimization
-
-    if needs_optimization:
-        print(f"⚠️ Content too long ({character_count} > {limit} chars) - needs optimization")
-    else:
-        print(f"✅ Content length OK ({character_count} <= {limit} chars)")
+    if not needs_optimization:
+        logger.info("✅ Content length OK (%d <= %d chars)", character_count, limit)
+        return {"needs_optimization": False}
+
+    # A small overshoot can usually be fixed by dropping the last sentence,
+    # which saves a whole LLM call
+    if character_count <= limit * LOCAL_TRIM_MAX_OVERSHOOT:
+        trimmed = trim_to_sentences(state.get("raw_content") or "", limit)
+        if len(trimmed) >= limit * LOCAL_TRIM_MIN_KEEP:
+            logger.info(
+                "✂️ Content slightly long (%d > %d chars) - trimmed to %d chars",
+                character_count, limit, len(trimmed)
+            )
+            return {"needs_optimization": True, "optimized_content": trimmed}
 
-    return state
+    logger.warning("⚠️ Content too long (%d > %d chars) - needs optimization", character_count, limit)
+    # Counted once here so the optimize node can size its output budget
+    return {"needs_optimization": True, "token_count": count_tokens(state.get("raw_content") or "")}
 
-def optimize_content_node(state: PostCreationState) -> PostCreationState:
+async def optimize_content_node(state: PostCreationState) -> dict:
     """Node 3: Optimize content if needed"""
-    print("⚡ Optimizing content...")
-
-    llm = setup_ai_model()
-
-    platform_limits = {
-        "twitter": 280,
-        "linkedin": 3000,
-        "instagram": 2200,
-        "facebook": 63206
-    }
-
-    limit = platform_limits.get(state["platform"].lower(), 280)
+    logger.info("⚡ Optimizing content...")
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a social media optimization expert. Make content better and shorter."),
-        ("human", """
-        Optimize this {platform} post to be under {char_limit} characters while keeping it engaging:
+    limit = state["char_limit"]
+    max_chars = int(limit * OPTIMIZE_ABORT_RATIO)
 
-        Original content:
-        {original_content}
-
-        Make it:
-        - Under {char_limit} characters
-        - More engaging and punchy
-        - Platform-appropriate
-        - Maintain the key message
-        """)
-    ])
-
-    chain = prompt | llm | StrOutputParser()
+    # The shortened post will have about the same characters per token as
+    # the original, which is a better budget than the generic estimate
+    token_count = state.get("token_count")
+    character_count = state.get("character_count")
+    if token_count and character_count:
+        max_tokens = min(MAX_OUTPUT_TOKENS, math.ceil(token_count * limit / character_count))
+    else:
+        max_tokens = output_token_budget(limit)
 
     try:
-        optimized_content = chain.invoke({
+        # Stream the answer so it can be cut off as soon as it's clearly too long
+        chunks = []
+        length = 0
+        stream = optimize_content_chain(max_tokens).astream({
             "platform": state["platform"],
             "char_limit": limit,
             "original_content": state["raw_content"]
         })
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                length += len(chunk)
+                if length > max_chars:
+                    break
+        finally:
+            # Closing the stream also closes the HTTP response
+            await stream.aclose()
 
-        state["optimized_content"] = optimized_content.strip()
-        state["character_count"] = len(state["optimized_content"])
+        optimized_content = "".join(chunks).strip()
+        if length > max_chars:
+            logger.warning("⚠️ Optimized content passed %d chars - stopped early and trimmed locally", max_chars)
+            optimized_content = trim_to_limit(optimized_content, limit)
 
-        print(f"✅ Optimized content: {state['optimized_content'][:50]}...")
+        logger.info("✅ Optimized content: %.50s...", optimized_content)
 
-    except Exception as e:
-        state["errors"] = state.get("errors", []) + [f"Optimization error: {str(e)}"]
-        print(f"❌ Error optimizing content: {e}")
+        return {"optimized_content": optimized_content}
 
-    return state
+    except Exception as e:
+        logger.error("❌ Error optimizing content: %s", e)
+        raise RuntimeError(f"Optimization error: {str(e)}") from e
 
-def generate_hashtags_node(state: PostCreationState) -> PostCreationState:
+async def generate_hashtags_node(state: PostCreationState) -> dict:
     """Node 4: Generate hashtags"""
-    print("🏷️ Generating hashtags...")
-
-    llm = setup_ai_model()
-
-    # Use optimized content if available, otherwise raw content
-    content = state.get("optimized_content") or state.get("raw_content", "")
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are a hashtag expert. Generate relevant, trending hashtags."),
-        ("human", """
-        Generate 5-8 relevant hashtags for this {platform} post:
-        "{content}"
+    logger.info("🏷️ Generating hashtags...")
 
-        Topic: {topic}
-        Target audience: {target_audience}
-
-        Return only the hashtags, separated by spaces.
-        Mix popular and niche hashtags.
-        """)
-    ])
-
-    chain = prompt | llm | StrOutputParser()
+    # Runs at the same time as optimize_content, so it works from the raw
+    # content (hashtags depend on the topic, not the exact wording)
+    content = state.get("raw_content") or ""
 
     try:
-        hashtag_text = chain.invoke({
+        hashtag_text = await generate_hashtags_chain().ainvoke({
             "platform": state["platform"],
             "content": content,
             "topic": state["topic"],
             "target_audience": state["target_audience"]
         })
 
-        # Parse hashtags
-        hashtags = [tag.strip() for tag in hashtag_text.split() if tag.startswith("#")]
-        state["hashtags"] = hashtags
+        # Parse hashtags in one regex pass, dropping repeats but keeping order
+        hashtags = parse_hashtags(hashtag_text)
 
-        print(f"✅ Generated hashtags: {' '.join(hashtags)}")
+        # Skip the join entirely when nobody is listening
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("✅ Generated hashtags: %s", " ".join(hashtags))
 
-    except Exception as e:
-        state["errors"] = state.get("errors", []) + [f"Hashtag generation error: {str(e)}"]
-        print(f"❌ Error generating hashtags: {e}")
+        return {"hashtags": hashtags}
 
-    return state
+    except Exception as e:
+        logger.error("❌ Error generating hashtags: %s", e)
+        raise RuntimeError(f"Hashtag generation error: {str(e)}") from e
 
-def finalize_post_node(state: PostCreationState) -> PostCreationState:
+def finalize_post_node(state: PostCreationState) -> dict:
     """Node 5: Combine everything into final post"""
-    print("🎯 Finalizing post...")
+    logger.info("🎯 Finalizing post...")
 
     # Use optimized content if available, otherwise raw content
-    content = state.get("optimized_content") or state.get("raw_content", "")
-    hashtags = state.get("hashtags", [])
+    content = state.get("optimized_content") or state.get("raw_content") or ""
+    hashtags = state.get("hashtags") or []
 
     # Combine content and hashtags
-    final_post = content
-    if hashtags:
-        final_post += "\n\n" + " ".join(hashtags)
+    final_post = compose_post(content, hashtags)
 
-    state["final_post"] = final_post
-    state["character_count"] = len(final_post)
+    logger.info("✅ Final post ready (%d characters)", len(final_post))
 
-    print(f"✅ Final post ready ({state['character_count']} characters)")
-
-    return state
+    return {"final_post": final_post, "character_count": len(final_post)}
 
 # 📖 LESSON: Conditional routing - making decisions in workflows
-def should_optimize(state: PostCreationState) -> str:
-    """Conditional edge: decide if content needs optimization"""
-    if state.get("needs_optimization", False):
-        return "optimize"
+def should_optimize(state: PostCreationState) -> List[str]:
+    """Conditional edge: pick the nodes to run after the length check"""
+    # Content the length check already trimmed doesn't need the LLM
+    if state.get("needs_optimization", False) and not state.get("optimized_content"):
+        # Hashtags don't need the optimized text, so run both at once
+        return ["optimize_content", "generate_hashtags"]
     else:
-        return "skip_optimization"
+        return ["generate_hashtags"]
 
 # 📖 LESSON: Building your first LangGraph workflow
-def create_post_creation_workflow():
+def create_post_creation_workflow(checkpointer=None):
     """Create a complete post creation workflow using LangGraph"""
 
     # Create the state graph
     workflow = StateGraph(PostCreationState)
 
     # Add all nodes to the graph
-    workflow.add_node("generate_content", generate_content_node)
+    workflow.add_node(
+        "generate_content", generate_content_node,
+        cache_policy=cache_policy_for("platform", "topic", "target_audience")
+    )
     workflow.add_node("check_optimization", check_optimization_needed_node)
-    workflow.add_node("optimize_content", optimize_content_node)
-    workflow.add_node("generate_hashtags", generate_hashtags_node)
+    workflow.add_node(
+        "optimize_content", optimize_content_node,
+        cache_policy=cache_policy_for("platform", "raw_content")
+    )
+    workflow.add_node(
+        "generate_hashtags", generate_hashtags_node,
+        cache_policy=cache_policy_for("platform", "topic", "target_audience", "raw_content")
+    )
     workflow.add_node("finalize_post", finalize_post_node)
 
     # Define the workflow edges (flow between nodes)
     workflow.set_entry_point("generate_content")
 
-    # Linear flow: generate -> check -> conditional -> hashtags -> finalize
+    # Flow: generate -> check -> (optimize + hashtags in parallel) -> finalize
     workflow.add_edge("generate_content", "check_optimization")
 
-    # Conditional edge: check if optimization is needed
+    # Conditional edge: fan out to one or both of the next nodes
     workflow.add_conditional_edges(
         "check_optimization",
         should_optimize,
-        {
-            "optimize": "optimize_content",
-            "skip_optimization": "generate_hashtags"
-        }
+        ["optimize_content", "generate_hashtags"]
     )
 
-    # Continue flow
-    workflow.add_edge("optimize_content", "generate_hashtags")
+    # Fan back in: finalize runs once both branches have finished
+    workflow.add_edge("optimize_content", "finalize_post")
     workflow.add_edge("generate_hashtags", "finalize_post")
     workflow.add_edge("finalize_post", END)
 
-    # Compile the graph
-    app = workflow.compile()
+    # Compile the graph (the cache stores results for nodes with a cache policy,
+    # the optional checkpointer saves the state after every step)
+    app = workflow.compile(cache=NODE_CACHE, checkpointer=checkpointer)
 
     return app
 
+# 📖 LESSON: Fusing LLM steps with structured output
+# The workflow above can make three LLM calls in a row (generate, optimize,
+# hashtags), and each one pays for a network round-trip plus its own prompt.
+# When one prompt can ask for everything at once, structured output lets the
+# model return every field in a single call. The length check stays as a
+# validator. If the model still runs over the limit, the post is trimmed
+# locally instead of paying for a second LLM call.
+class PostDraft(BaseModel):
+    """A complete post returned by a single LLM call"""
+    content: str = Field(description="The post text, without hashtags")
+    hashtags: List[str] = Field(description="5-8 relevant hashtags, each starting with #")
+
+DRAFT_POST_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a social media content creator and hashtag expert.
+
+    Write one engaging, platform-appropriate post for the request you are given.
+    - Keep the content strictly under the character limit
+    - Don't put hashtags in the content
+    - Provide 5-8 relevant hashtags, mixing popular and niche ones
+    """),
+    ("human", """
+    Platform: {platform}
+    Character limit: {char_limit}
+    Topic: {topic}
+    Target audience: {target_audience}
+    """)
+])
+
+@functools.lru_cache(maxsize=None)
+def draft_post_chain(max_tokens: int):
+    """Chain for draft_post_node"""
+    # function_calling works with every chat model, including gpt-3.5-turbo
+    return DRAFT_POST_PROMPT | setup_ai_model(max_tokens=max_tokens).with_structured_output(
+        PostDraft, method="function_calling"
+    )
+
+async def draft_post_node(state: PostCreationState) -> dict:
+    """Fused node: generate the content and hashtags in one LLM call"""
+    logger.info("📝 Drafting post and hashtags for %s about %s...", state["platform"], state["topic"])
+
+    limit = platform_char_limit(state["platform"])
+
+    try:
+        # Room for the post, plus the hashtags and JSON wrapping
+        max_tokens = output_token_budget(limit) + HASHTAG_MAX_TOKENS
+        draft = await draft_post_chain(max_tokens).ainvoke({
+            "platform": state["platform"],
+            "char_limit": limit,
+            "topic": state["topic"],
+            "target_audience": state["target_audience"]
+        })
+
+        raw_content = draft.content.strip()
+        hashtags = parse_hashtags(" ".join(draft.hashtags))
+
+        logger.info("✅ Drafted content: %.50s...", raw_content)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("✅ Drafted hashtags: %s", " ".join(hashtags))
+
+        return {
+            "char_limit": limit,
+            "raw_content": raw_content,
+            "hashtags": hashtags,
+            "character_count": len(raw_content)
+        }
+
+    except Exception as e:
+        logger.error("❌ Error drafting post: %s", e)
+        raise RuntimeError(f"Draft generation error: {str(e)}") from e
+
+def trim_content_node(state: PostCreationState) -> dict:
+    """Fallback node: trim over-limit content locally (no LLM call)"""
+    logger.info("✂️ Trimming content to the platform limit...")
+
+    limit = state["char_limit"]
+    optimized_content = trim_to_limit(state.get("raw_content") or "", limit)
+
+    logger.info("✅ Trimmed content to %d characters", len(optimized_content))
+
+    return {"optimized_content": optimized_content}
+
+def should_trim(state: PostCreationState) -> str:
+    """Conditional edge: trim only when the draft is over the limit"""
+    if state.get("needs_optimization", False) and not state.get("optimized_content"):
+        return "trim_content"
+    return "finalize_post"
+
+def create_fused_post_workflow(checkpointer=None):
+    """Create the single-LLM-call version of the post creation workflow"""
+
+    workflow = StateGraph(PostCreationState)
+
+    # The length check and finalize step are reused unchanged
+    workflow.add_node(
+        "draft_post", draft_post_node,
+        cache_policy=cache_policy_for("platform", "topic", "target_audience")
+    )
+    workflow.add_node("check_optimization", check_optimization_needed_node)
+    workflow.add_node("trim_content", trim_content_node)
+    workflow.add_node("finalize_post", finalize_post_node)
+
+    # Flow: draft -> check -> (trim if needed) -> finalize
+    workflow.set_entry_point("draft_post")
+    workflow.add_edge("draft_post", "check_optimization")
+    workflow.add_conditional_edges(
+        "check_optimization",
+        should_trim,
+        ["trim_content", "finalize_post"]
+    )
+    workflow.add_edge("trim_content", "finalize_post")
+    workflow.add_edge("finalize_post", END)
+
+    return workflow.compile(cache=NODE_CACHE, checkpointer=checkpointer)
+
+# 📖 LESSON: Resuming a failed run from its last checkpoint
+# With a checkpointer, every finished step is saved under the run's thread_id.
+# Invoking again with None as the input and the same thread_id picks up where
+# the failed run stopped, so the steps that already succeeded (and their LLM
+# calls) are not repeated.
+async def invoke_with_resume(app, initial_state: PostCreationState, config: dict) -> dict:
+    """Run the workflow, resuming once from the last checkpoint if it fails"""
+    try:
+        return await app.ainvoke(initial_state, config)
+    except Exception as e:
+        logger.warning("🔁 Workflow failed (%s) - resuming from the last checkpoint...", e)
+
+    try:
+        return await app.ainvoke(None, config)
+    except Exception as e:
+        # Report the failure in the state, next to whatever the run finished
+        logger.error("❌ Workflow failed again: %s", e)
+        state = (await app.aget_state(config)).values
+        return {**state, "errors": [*state.get("errors", []), str(e)]}
+
 # 📖 LESSON: Running your workflow
-def run_workflow_example():
+async def run_workflow_example(fused: bool = False):
     """Run the post creation workflow with example data"""
 
     print("🚀 Running PostProber Content Creation Workflow")
     print("=" * 60)
 
-    # Create the workflow
-    app = create_post_creation_workflow()
-
     # Initial state (user input)
     initial_state = PostCreationState(
         topic="productivity tips for remote workers",
         platform="Twitter",
         target_audience="remote professionals and entrepreneurs",
-        raw_content=None,
-        optimized_content=None,
-        hashtags=None,
-        character_count=None,
-        final_post=None,
-        needs_optimization=None,
-        errors=None
+        errors=[]
     )
 
     print("📥 Input:")
@@ -315,9 +636,17 @@ def run_workflow_example():
     print(f"  Audience: {initial_state['target_audience']}")
     print("\n🔄 Workflow Execution:")
 
+    # A new thread per run - reusing one would continue that thread's state
+    config = {"configurable": {"thread_id": f"post-{uuid.uuid4().hex}"}}
+
     try:
-        # Run the workflow
-        final_state = app.invoke(initial_state)
+        async with AsyncSqliteSaver.from_conn_string(CHECKPOINT_DB) as checkpointer:
+            # Create the workflow (fused=True makes one LLM call instead of up to three)
+            create_workflow = create_fused_post_workflow if fused else create_post_creation_workflow
+            app = create_workflow(checkpointer=checkpointer)
+
+            # Run the workflow
+            final_state = await invoke_with_resume(app, initial_state, config)
 
         print("\n🎉 Workflow Complete!")
         print("=" * 60)
@@ -337,8 +666,33 @@ def run_workflow_example():
     except Exception as e:
         print(f"❌ Workflow error: {e}")
 
+# 📖 LESSON: Streaming tokens out of a running workflow
+# stream_mode="messages" yields each LLM token as it is generated, together
+# with the name of the node that produced it, so a UI can show the post
+# being written instead of waiting for the whole workflow to finish.
+async def stream_workflow_example():
+    """Print the workflow's LLM output token by token"""
+
+    app = create_post_creation_workflow()
+
+    initial_state = PostCreationState(
+        topic="why async code makes AI apps feel faster",
+        platform="Twitter",
+        target_audience="Python developers",
+        errors=[]
+    )
+
+    current_node = None
+    async for token, metadata in app.astream(initial_state, stream_mode="messages"):
+        node = metadata.get("langgraph_node")
+        if node != current_node:
+            current_node = node
+            print(f"\n\n🔄 [{node}] ", end="")
+        print(token.content, end="", flush=True)
+    print()
+
 # 📖 LESSON: Multiple workflow examples
-def run_multiple_examples():
+async def run_multiple_examples():
     """Run the workflow with different inputs to see how it adapts"""
 
     app = create_post_creation_workflow()
@@ -350,8 +704,7 @@ def run_multiple_examples():
                 topic="coffee",
                 platform="Twitter",
                 target_audience="coffee lovers",
-                raw_content=None, optimized_content=None, hashtags=None,
-                character_count=None, final_post=None, needs_optimization=None, errors=None
+                errors=[]
             )
         },
         {
@@ -360,25 +713,34 @@ def run_multiple_examples():
                 topic="leadership strategies for startup founders in 2024 with detailed case studies and actionable insights",
                 platform="LinkedIn",
                 target_audience="startup founders and business leaders",
-                raw_content=None, optimized_content=None, hashtags=None,
-                character_count=None, final_post=None, needs_optimization=None, errors=None
+                errors=[]
             )
         }
     ]
 
-    for i, test_case in enumerate(test_cases, 1):
+    # The test cases are independent, so run them all at once: abatch overlaps
+    # their LLM calls instead of waiting for each workflow to finish in turn
+    results = await app.abatch(
+        [test_case["state"] for test_case in test_cases],
+        config={"max_concurrency": len(test_cases)},
+        return_exceptions=True
+    )
+
+    for i, (test_case, result) in enumerate(zip(test_cases, results), 1):
         print(f"\n🧪 Test Case {i}: {test_case['name']}")
         print("=" * 50)
 
-        try:
-            result = app.invoke(test_case["state"])
-            print(f"✅ Result: {len(result.get('final_post', ''))} characters")
-            print(f"📱 Preview: {result.get('final_post', '')[:100]}...")
+        if isinstance(result, Exception):
+            print(f"❌ Error: {result}")
+            continue
 
-        except Exception as e:
-            print(f"❌ Error: {e}")
+        print(f"✅ Result: {len(result.get('final_post', ''))} characters")
+        print(f"📱 Preview: {result.get('final_post', '')[:100]}...")
 
 if __name__ == "__main__":
+    # Show the nodes' progress messages alongside the example output
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     print("📊 Welcome to LangGraph - Building AI Workflows!")
     print("=" * 60)
 
@@ -387,14 +749,22 @@ if __name__ == "__main__":
     # Example 1: Single workflow run
     print("\n📖 Example 1: Post Creation Workflow")
     try:
-        run_workflow_example()
+        asyncio.run(run_workflow_example())
     except Exception as e:
         print(f"❌ Error: {e}")
         print("💡 Tip: Make sure to set your OPENAI_API_KEY environment variable")
 
     # Example 2: Multiple examples
     print("\n📖 Example 2: Multiple Workflow Examples")
-    # run_multiple_examples()
+    # asyncio.run(run_multiple_examples())
+
+    # Example 3: Same post from a single structured-output LLM call
+    print("\n📖 Example 3: Fused Single-Call Workflow")
+    # asyncio.run(run_workflow_example(fused=True))
+
+    # Example 4: Watch the LLM output stream in as the workflow runs
+    print("\n📖 Example 4: Streaming Workflow Tokens")
+    # asyncio.run(stream_workflow_example())
 
     print("\n🎉 Fantastic! You now understand LangGraph workflows!")
     print("🔄 You've seen how to create complex, multi-step AI processes!")
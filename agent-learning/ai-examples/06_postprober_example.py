@@ -18,21 +18,88 @@ Key Concepts:
 - Production deployment patterns
 """
 
-from typing import TypedDict, List, Optional, AsyncGenerator
+from typing import TypedDict, Dict, List, Optional, AsyncGenerator
 from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.prompts import ChatPromptTemplate
+from langchain.schema import Generation
 from langchain.schema.output_parser import StrOutputParser
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
+from langchain_community.cache import RedisSemanticCache, SQLiteCache
+from langchain.globals import set_llm_cache
 import asyncio
+import functools
 import json
+import time
 import uuid
 from datetime import datetime
+from types import MappingProxyType
 import os
+from pathlib import Path
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-# Load environment variables from PostProber .env file
-load_dotenv(dotenv_path="../../.env")
+try:
+    import orjson
+except ImportError:  # optional - responses are then encoded with json
+    orjson = None
+
+# 📖 LESSON: Response caching
+# A request whose prompt was seen before is answered from a cache instead of
+# calling OpenAI again. Only agents running at temperature 0 give the same
+# answer every time, so those are the ones whose cached answers stand in for
+# a fresh call without changing the result. setup_ai_model keeps every
+# other client out of the cache.
+#
+# Users rarely type the same request twice, though. With REDIS_URL set, a
+# semantic cache (as in lesson 5) also reuses the answer to a near-identical
+# earlier request. Embedding the whole rendered prompt would not work: it is
+# mostly the agent's fixed instructions, so two quite different requests
+# would still look alike. cached_ainvoke embeds only the request's free-text
+# field, and the agent's tag plus every other input must match exactly.
+# Only the scheduler has such a field (the post). The analytics agent's
+# input is numbers, which embed poorly, so it keeps exact-match caching.
+SEMANTIC_CACHE_MAX_DISTANCE = 0.05  # cosine distance, i.e. similarity >= 0.95
+
+def setup_llm_cache():
+    """Install the exact-match LLM response cache in a local file"""
+    set_llm_cache(SQLiteCache(database_path=".langchain.db"))
+
+@functools.lru_cache(maxsize=1)
+def semantic_cache():
+    """Semantic cache for cached_ainvoke, or None without REDIS_URL"""
+    if not os.getenv("REDIS_URL"):
+        return None
+    return RedisSemanticCache(
+        redis_url=os.environ["REDIS_URL"],
+        embedding=OpenAIEmbeddings(model="text-embedding-3-small"),
+        score_threshold=SEMANTIC_CACHE_MAX_DISTANCE
+    )
+
+async def cached_ainvoke(chain, inputs: dict, tag: str, text_field: str) -> str:
+    """Invoke a text chain, reusing the answer to a near-identical earlier request"""
+    cache = semantic_cache()
+    if cache is None:
+        return await chain.ainvoke(inputs)
+
+    # The cache keeps one index per key, so each agent and combination of
+    # exact inputs is searched on its own
+    text = inputs[text_field]
+    exact_inputs = {name: value for name, value in inputs.items() if name != text_field}
+    key = json.dumps([tag, exact_inputs], sort_keys=True, default=str)
+
+    cached = await cache.alookup(text, key)
+    if cached:
+        return cached[0].text
+
+    response = await chain.ainvoke(inputs)
+    await cache.aupdate(text, key, [Generation(text=response)])
+    return response
+
+# Agents that report facts (scheduling, analytics) run deterministically;
+# the writing agents keep some creativity
+ANALYSIS_TEMPERATURE = 0.0
+CREATIVE_TEMPERATURE = 0.7
 
 # 📖 LESSON: Production-ready state management
 class PostProberAIState(TypedDict):
@@ -58,22 +125,215 @@ class PostProberAIState(TypedDict):
     next_actions: Optional[List[str]]
 
     # System
-    errors: Optional[List[str]]
+    errors: List[str]
     processing_time: Optional[float]
     model_usage: Optional[dict]
 
-def setup_ai_model():
-    """Production AI model setup with error handling"""
+# Built once per temperature and shared by every request, so the agents
+# reuse the same clients and their open connections
+@functools.lru_cache(maxsize=None)
+def setup_ai_model(temperature=CREATIVE_TEMPERATURE):
+    """Production AI model setup with error handling (one client per temperature)"""
     return ChatOpenAI(
         model="gpt-3.5-turbo",
-        temperature=0.7,
+        temperature=temperature,
         max_tokens=1000,
         request_timeout=30,
-        max_retries=2
+        max_retries=2,
+        # The LLM cache is global, so creative clients have to opt out of it
+        cache=False if temperature > 0 else None
+    )
+
+# 📖 LESSON: Prompt templates are built once and shared by every request
+# Each prompt puts everything that never changes (role, rules, answer
+# format) in the system message and only the request's own details, always
+# in the same order, at the very end. Every call of an agent then starts
+# with the same text, which OpenAI's prompt caching can reuse once prompts
+# are long enough (1024+ tokens) - and a cached prefix is billed at a
+# discount and processed faster.
+
+# The writing assistant has one prompt per stage of the draft
+WRITING_HOOK_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are PostProber's AI writing assistant. Help users create engaging opening hooks.
+
+    The user is starting a post. Suggest 3 compelling opening hooks that will grab attention.
+    Keep them short, engaging, and platform-appropriate.
+    """),
+    ("human", """
+    Platform: {platform}
+    Topic: {topic}
+    """)
+])
+
+WRITING_EXPANSION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are PostProber's AI writing assistant. Help expand and improve content.
+
+    Suggest ways to expand the user's draft while keeping it engaging.
+    Provide 2-3 specific suggestions for the next sentence.
+    """),
+    ("human", """
+    Platform: {platform}
+    Current draft: "{current_text}"
+    """)
+])
+
+WRITING_OPTIMIZATION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are PostProber's AI writing assistant. Help optimize and finalize content.
+
+    Suggest final optimizations for the user's content:
+    1. Improve engagement
+    2. Add a compelling CTA
+    3. Check platform best practices
+    """),
+    ("human", """
+    Platform: {platform}
+    Current content: "{current_text}"
+    """)
+])
+
+_WRITING_PROMPTS = {
+    "hook_suggestions": WRITING_HOOK_PROMPT,
+    "content_expansion": WRITING_EXPANSION_PROMPT,
+    "optimization": WRITING_OPTIMIZATION_PROMPT
+}
+
+SCHEDULER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are PostProber's intelligent scheduling assistant. You analyze content and user data to recommend optimal posting times.
+
+    Consider:
+    - Platform-specific peak times
+    - Content type and topic
+    - Historical user performance
+    - Audience demographics
+
+    Provide:
+    1. Best posting time today
+    2. Best posting time this week
+    3. Reasoning for recommendations
+    4. Alternative time slots
+    5. Expected engagement improvement %
+    """),
+    ("human", """
+    Analyze this content for optimal scheduling:
+
+    Platform: {platform}
+    Content category: {category}
+    User's historical best performance: {best_times}
+    Content: "{content}"
+    """)
+])
+
+ANALYTICS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are PostProber's analytics AI. You analyze social media performance data and provide actionable insights.
+
+    You excel at:
+    - Identifying trends and patterns
+    - Suggesting improvements
+    - Predicting future performance
+    - Providing clear, actionable recommendations
+
+    The user sends a time period and their performance metrics as JSON
+    (total_posts, total_engagement, best_platform, top_content_type,
+    engagement_trend). Provide insights:
+    1. Key performance highlights
+    2. Areas for improvement
+    3. Content strategy recommendations
+    4. Posting schedule optimizations
+    5. Platform-specific suggestions
+
+    Make recommendations specific and actionable.
+    """),
+    ("human", """
+    Time period: {time_period}
+    Performance data: {metrics}
+    """)
+])
+
+CONTENT_OPTIMIZER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are PostProber's content optimization specialist. You improve content for maximum engagement while maintaining the original message.
+
+    You optimize for:
+    - Platform-specific best practices
+    - Engagement-driving techniques
+    - Clear calls-to-action
+    - Brand voice consistency
+
+    Return the optimized version, the key improvements made (each with why
+    it will improve performance), the expected engagement increase and a
+    1-10 score for the optimized post.
+    """),
+    ("human", """
+    Platform: {platform}
+    Goals: {goals}
+    Original: "{original_content}"
+    """)
+])
+
+# 📖 LESSON: Structured output instead of parsing text
+# The optimizer returns its answer as a schema, so the optimized post comes
+# back as its own field - there's no searching the reply for section
+# headers, which silently broke whenever the model worded them differently.
+class OptimizationResult(BaseModel):
+    """The content optimizer's answer"""
+    optimized_content: str = Field(description="The optimized post, ready to publish")
+    improvements: List[str] = Field(description="Key improvements made, each with why it helps")
+    predicted_improvement: str = Field(description="Expected engagement increase, e.g. '25-35%'")
+    optimization_score: float = Field(description="Quality of the optimized post (1-10)")
+
+# 📖 LESSON: Chains are built once and shared by every request
+# Built on first use rather than at import, so the module can be imported
+# before OPENAI_API_KEY is set.
+@functools.lru_cache(maxsize=None)
+def writing_assistant_chain(prompt_type):
+    """Chain for ai_writing_assistant, one per stage of the draft"""
+    return _WRITING_PROMPTS[prompt_type] | setup_ai_model() | StrOutputParser()
+
+@functools.lru_cache(maxsize=1)
+def scheduler_chain():
+    """Chain for smart_scheduler_agent"""
+    return SCHEDULER_PROMPT | setup_ai_model(temperature=ANALYSIS_TEMPERATURE) | StrOutputParser()
+
+@functools.lru_cache(maxsize=1)
+def analytics_chain():
+    """Chain for analytics_insights_agent"""
+    return ANALYTICS_PROMPT | setup_ai_model(temperature=ANALYSIS_TEMPERATURE) | StrOutputParser()
+
+@functools.lru_cache(maxsize=1)
+def content_optimizer_chain():
+    """Chain for content_optimizer_agent"""
+    # function_calling works with every chat model, including gpt-3.5-turbo
+    return CONTENT_OPTIMIZER_PROMPT | setup_ai_model().with_structured_output(
+        OptimizationResult, method="function_calling"
     )
 
+# Mock results the agents return alongside the LLM's answer. They never
+# change, so they are built once, read-only, instead of on every request
+# (JSON encodes the tuples as arrays, and they can be shared safely).
+_PLATFORM_POSTING_TIMES = MappingProxyType({
+    "twitter": "14:00",  # 2 PM
+    "linkedin": "08:00", # 8 AM
+    "instagram": "19:00" # 7 PM
+})
+_ALTERNATIVE_TIMES = ("10:00", "16:00", "20:00")
+_ANALYTICS_RECOMMENDATIONS = (
+    "Increase posting frequency on LinkedIn",
+    "Focus more on educational content",
+    "Post during weekday mornings",
+    "Use more video content"
+)
+
 # 📖 LESSON: PostProber-specific AI agents for real features
 
+def writing_prompt_type(current_text: str) -> str:
+    """Pick the writing assistant's prompt for how far along the draft is"""
+    # Different prompts based on what user needs
+    if len(current_text) < 10:  # Just starting
+        return "hook_suggestions"
+    elif len(current_text) < 100:  # Building content
+        return "content_expansion"
+    else:  # Finishing touches
+        return "optimization"
+
 async def ai_writing_assistant(state: PostProberAIState) -> PostProberAIState:
     """Real-time writing assistant for the Compose page"""
     print("✍️ AI Writing Assistant: Providing real-time suggestions...")
@@ -86,48 +346,8 @@ async def ai_writing_assistant(state: PostProberAIState) -> PostProberAIState:
     platform = user_input.get("platform", "twitter")
     user_preferences = state["platform_settings"]
 
-    llm = setup_ai_model()
-
-    # Different prompts based on what user needs
-    if len(current_text) < 10:  # Just starting
-        prompt_type = "hook_suggestions"
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are PostProber's AI writing assistant. Help users create engaging opening hooks."),
-            ("human", """
-            The user is starting a {platform} post about: {topic}
-
-            Suggest 3 compelling opening hooks that will grab attention.
-            Keep them short, engaging, and platform-appropriate.
-            """)
-        ])
-    elif len(current_text) < 100:  # Building content
-        prompt_type = "content_expansion"
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are PostProber's AI writing assistant. Help expand and improve content."),
-            ("human", """
-            Current draft: "{current_text}"
-            Platform: {platform}
-
-            Suggest ways to expand this content while keeping it engaging.
-            Provide 2-3 specific suggestions for the next sentence.
-            """)
-        ])
-    else:  # Finishing touches
-        prompt_type = "optimization"
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are PostProber's AI writing assistant. Help optimize and finalize content."),
-            ("human", """
-            Current content: "{current_text}"
-            Platform: {platform}
-
-            Suggest final optimizations:
-            1. Improve engagement
-            2. Add a compelling CTA
-            3. Check platform best practices
-            """)
-        ])
-
-    chain = prompt | llm | StrOutputParser()
+    prompt_type = writing_prompt_type(current_text)
+    chain = writing_assistant_chain(prompt_type)
 
     try:
         response = await chain.ainvoke({
@@ -140,7 +360,7 @@ async def ai_writing_assistant(state: PostProberAIState) -> PostProberAIState:
         ai_response = {
             "type": prompt_type,
             "suggestions": response,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": state["timestamp"],
             "confidence": 0.85
         }
 
@@ -151,7 +371,7 @@ async def ai_writing_assistant(state: PostProberAIState) -> PostProberAIState:
         print(f"✅ Provided {prompt_type} suggestions")
 
     except Exception as e:
-        state["errors"] = state.get("errors", []) + [f"Writing assistance error: {str(e)}"]
+        state["errors"].append(f"Writing assistance error: {str(e)}")
         print(f"❌ Writing assistance error: {e}")
 
     return state
@@ -168,58 +388,25 @@ async def smart_scheduler_agent(state: PostProberAIState) -> PostProberAIState:
     platform = user_input.get("platform", "twitter")
     user_analytics = state["platform_settings"].get("analytics_data", {})
 
-    llm = setup_ai_model()
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are PostProber's intelligent scheduling assistant. You analyze content and user data to recommend optimal posting times.
-
-        Consider:
-        - Platform-specific peak times
-        - Content type and topic
-        - Historical user performance
-        - Audience demographics
-        """),
-        ("human", """
-        Analyze this content for optimal scheduling:
-
-        Content: "{content}"
-        Platform: {platform}
-        User's historical best performance: {best_times}
-        Content category: {category}
-
-        Provide:
-        1. Best posting time today
-        2. Best posting time this week
-        3. Reasoning for recommendations
-        4. Alternative time slots
-        5. Expected engagement improvement %
-        """)
-    ])
-
-    chain = prompt | llm | StrOutputParser()
+    chain = scheduler_chain()
 
     try:
-        response = await chain.ainvoke({
+        # Scheduling runs at temperature 0, so a similar post can share an answer
+        response = await cached_ainvoke(chain, {
             "content": content,
             "platform": platform,
             "best_times": user_analytics.get("best_times", "Not available"),
             "category": user_input.get("category", "general")
-        })
+        }, tag="scheduler", text_field="content")
 
         # Mock optimal times based on platform
-        platform_times = {
-            "twitter": "14:00",  # 2 PM
-            "linkedin": "08:00", # 8 AM
-            "instagram": "19:00" # 7 PM
-        }
-
         scheduling_result = {
-            "optimal_time_today": platform_times.get(platform, "12:00"),
+            "optimal_time_today": _PLATFORM_POSTING_TIMES.get(platform, "12:00"),
             "optimal_day_this_week": "Tuesday",
             "reasoning": response,
             "confidence_score": 0.82,
             "expected_improvement": "15-25%",
-            "alternative_times": ["10:00", "16:00", "20:00"]
+            "alternative_times": _ALTERNATIVE_TIMES
         }
 
         state["final_result"] = scheduling_result
@@ -229,7 +416,7 @@ async def smart_scheduler_agent(state: PostProberAIState) -> PostProberAIState:
         print(f"✅ Scheduling analysis complete")
 
     except Exception as e:
-        state["errors"] = state.get("errors", []) + [f"Scheduling error: {str(e)}"]
+        state["errors"].append(f"Scheduling error: {str(e)}")
         print(f"❌ Scheduling error: {e}")
 
     return state
@@ -245,39 +432,7 @@ async def analytics_insights_agent(state: PostProberAIState) -> PostProberAIStat
     analytics_data = user_input.get("analytics_data", {})
     time_period = user_input.get("time_period", "7d")
 
-    llm = setup_ai_model()
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are PostProber's analytics AI. You analyze social media performance data and provide actionable insights.
-
-        You excel at:
-        - Identifying trends and patterns
-        - Suggesting improvements
-        - Predicting future performance
-        - Providing clear, actionable recommendations
-        """),
-        ("human", """
-        Analyze this social media performance data:
-
-        Time period: {time_period}
-        Total posts: {total_posts}
-        Total engagement: {total_engagement}
-        Best performing platform: {best_platform}
-        Top content type: {top_content_type}
-        Engagement rate trend: {engagement_trend}
-
-        Provide insights:
-        1. Key performance highlights
-        2. Areas for improvement
-        3. Content strategy recommendations
-        4. Posting schedule optimizations
-        5. Platform-specific suggestions
-
-        Make recommendations specific and actionable.
-        """)
-    ])
-
-    chain = prompt | llm | StrOutputParser()
+    chain = analytics_chain()
 
     try:
         # Mock analytics data
@@ -289,20 +444,16 @@ async def analytics_insights_agent(state: PostProberAIState) -> PostProberAIStat
             "engagement_trend": analytics_data.get("engagement_trend", "Increasing (+12%)")
         }
 
+        # The varying numbers go last, as one compact JSON value
         response = await chain.ainvoke({
             "time_period": time_period,
-            **mock_data
+            "metrics": json.dumps(mock_data)
         })
 
         insights_result = {
             "summary": response,
             "key_metrics": mock_data,
-            "recommendations": [
-                "Increase posting frequency on LinkedIn",
-                "Focus more on educational content",
-                "Post during weekday mornings",
-                "Use more video content"
-            ],
+            "recommendations": _ANALYTICS_RECOMMENDATIONS,
             "predicted_growth": "20-30% engagement increase possible",
             "confidence": 0.78
         }
@@ -314,7 +465,7 @@ async def analytics_insights_agent(state: PostProberAIState) -> PostProberAIStat
         print(f"✅ Analytics insights generated")
 
     except Exception as e:
-        state["errors"] = state.get("errors", []) + [f"Analytics insights error: {str(e)}"]
+        state["errors"].append(f"Analytics insights error: {str(e)}")
         print(f"❌ Analytics insights error: {e}")
 
     return state
@@ -331,49 +482,22 @@ async def content_optimizer_agent(state: PostProberAIState) -> PostProberAIState
     platform = user_input.get("platform", "twitter")
     optimization_goals = user_input.get("goals", ["engagement"])
 
-    llm = setup_ai_model()
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are PostProber's content optimization specialist. You improve content for maximum engagement while maintaining the original message.
-
-        You optimize for:
-        - Platform-specific best practices
-        - Engagement-driving techniques
-        - Clear calls-to-action
-        - Brand voice consistency
-        """),
-        ("human", """
-        Optimize this {platform} content:
-
-        Original: "{original_content}"
-        Goals: {goals}
-
-        Provide:
-        1. Optimized version
-        2. Key improvements made
-        3. Why these changes will improve performance
-        4. Character count comparison
-        5. Engagement prediction increase
-        """)
-    ])
-
-    chain = prompt | llm | StrOutputParser()
+    chain = content_optimizer_chain()
 
     try:
-        response = await chain.ainvoke({
+        result = await chain.ainvoke({
             "platform": platform,
             "original_content": original_content,
             "goals": ", ".join(optimization_goals)
         })
 
-        # Mock optimization results
         optimization_result = {
-            "optimized_content": response.split("Optimized version:")[-1].split("Key improvements:")[0].strip() if "Optimized version:" in response else original_content,
-            "improvements": response,
+            "optimized_content": result.optimized_content,
+            "improvements": result.improvements,
             "original_length": len(original_content),
-            "optimized_length": len(original_content) - 20,  # Mock shorter
-            "predicted_improvement": "25-35%",
-            "optimization_score": 8.7
+            "optimized_length": len(result.optimized_content),
+            "predicted_improvement": result.predicted_improvement,
+            "optimization_score": result.optimization_score
         }
 
         state["final_result"] = optimization_result
@@ -383,24 +507,38 @@ async def content_optimizer_agent(state: PostProberAIState) -> PostProberAIState
         print(f"✅ Content optimization complete")
 
     except Exception as e:
-        state["errors"] = state.get("errors", []) + [f"Content optimization error: {str(e)}"]
+        state["errors"].append(f"Content optimization error: {str(e)}")
         print(f"❌ Content optimization error: {e}")
 
     return state
 
+# 📖 LESSON: Streaming suggestions token by token
+# ainvoke waits for the whole answer before returning anything. astream
+# hands over each piece of text as soon as OpenAI sends it, so the Compose
+# page can start showing a suggestion within a fraction of a second
+# instead of after the full response has been written.
+async def ai_writing_assistant_stream(current_text: str, platform: str, topic: str = "general") -> AsyncGenerator[str, None]:
+    """Streaming variant of ai_writing_assistant: yields the suggestions as they are written"""
+    chain = writing_assistant_chain(writing_prompt_type(current_text))
+
+    async for chunk in chain.astream({
+        "current_text": current_text,
+        "platform": platform,
+        "topic": topic
+    }):
+        yield chunk
+
 # 📖 LESSON: Workflow routing based on request type
+_REQUEST_ROUTES = MappingProxyType({
+    "writing_assistance": "writing_assistant",
+    "schedule_optimization": "scheduler",
+    "analytics_insights": "analytics",
+    "content_optimization": "optimizer"
+})
+
 def route_by_request_type(state: PostProberAIState) -> str:
     """Route to appropriate agent based on request type"""
-    request_type = state["request_type"]
-
-    routing_map = {
-        "writing_assistance": "writing_assistant",
-        "schedule_optimization": "scheduler",
-        "analytics_insights": "analytics",
-        "content_optimization": "optimizer"
-    }
-
-    return routing_map.get(request_type, "error_handler")
+    return _REQUEST_ROUTES.get(state["request_type"], "error_handler")
 
 async def error_handler(state: PostProberAIState) -> PostProberAIState:
     """Handle errors and provide fallback responses"""
@@ -434,15 +572,9 @@ def create_postprober_ai_workflow():
     workflow.add_node("optimizer", content_optimizer_agent)
     workflow.add_node("error_handler", error_handler)
 
-    # Set entry point
-    workflow.set_entry_point("router")
-
-    # Add router node
-    workflow.add_node("router", lambda state: state)  # Pass-through node for routing
-
-    # Conditional routing based on request type
-    workflow.add_conditional_edges(
-        "router",
+    # Conditional entry point: route straight to the agent for the request
+    # type, without an extra pass-through node to hang the routing off
+    workflow.set_conditional_entry_point(
         route_by_request_type,
         {
             "writing_assistant": "writing_assistant",
@@ -462,25 +594,49 @@ def create_postprober_ai_workflow():
 
     return workflow.compile()
 
+# The compiled workflow holds no per-request state (each request passes its
+# own), so every PostProberAI instance and request can share one
+@functools.lru_cache(maxsize=1)
+def get_workflow():
+    """The compiled PostProber AI workflow, built on first use and then reused"""
+    return create_postprober_ai_workflow()
+
 # 📖 LESSON: API integration patterns
+# Responses are JSON-encoded for every API call. orjson does that in C and
+# returns the bytes for the HTTP body directly; with FastAPI, the same is
+# done for every endpoint with FastAPI(default_response_class=ORJSONResponse).
+def to_json_bytes(response: dict) -> bytes:
+    """Encode an API response as a JSON body (with orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(response)
+    return json.dumps(response).encode("utf-8")
+
+def request_key(request_type: str, user_input: dict, platform_settings: dict) -> str:
+    """Identify requests that would produce the same result"""
+    return json.dumps([request_type, user_input, platform_settings], sort_keys=True, default=str)
+
 class PostProberAI:
     """Main PostProber AI service class"""
 
     def __init__(self):
-        self.workflow = create_postprober_ai_workflow()
-        self.active_sessions = {}
+        self.workflow = get_workflow()
+        # Workflow runs in progress, by request_key
+        self._inflight: Dict[str, asyncio.Task] = {}
 
     async def process_request(self, user_id: str, request_type: str, user_input: dict, platform_settings: dict = None) -> dict:
         """Main entry point for AI requests"""
 
         session_id = str(uuid.uuid4())
-        start_time = datetime.now()
+        # The ISO timestamp is sent to the frontend; the duration comes from
+        # a monotonic clock, which is cheaper and unaffected by clock changes
+        start = time.perf_counter()
+        timestamp = datetime.now().isoformat()
 
         # Create initial state
         initial_state = PostProberAIState(
             user_id=user_id,
             session_id=session_id,
-            timestamp=start_time.isoformat(),
+            timestamp=timestamp,
             request_type=request_type,
             user_input=user_input,
             platform_settings=platform_settings or {},
@@ -490,20 +646,32 @@ class PostProberAI:
             final_result=None,
             suggestions=None,
             next_actions=None,
-            errors=None,
+            errors=[],
             processing_time=None,
             model_usage=None
         )
 
         try:
-            # Execute workflow
-            print(f"🚀 Processing {request_type} request for user {user_id}")
-            final_state = await self.workflow.ainvoke(initial_state)
+            # 📖 LESSON: Single-flight - one run for identical requests
+            # When the same request arrives again while it is still running
+            # (a double click, several users on the same draft), the new
+            # caller waits for the run already in progress instead of paying
+            # for a second, identical set of OpenAI calls. The run is
+            # shielded so one caller giving up doesn't cancel it for the rest.
+            key = request_key(request_type, user_input, initial_state["platform_settings"])
+            run = self._inflight.get(key)
+            if run is None:
+                print(f"🚀 Processing {request_type} request for user {user_id}")
+                run = asyncio.ensure_future(self.workflow.ainvoke(initial_state))
+                self._inflight[key] = run
+                run.add_done_callback(lambda _: self._inflight.pop(key, None))
+            else:
+                print(f"🔗 Joining identical {request_type} request already in progress for user {user_id}")
+
+            final_state = await asyncio.shield(run)
 
             # Calculate processing time
-            end_time = datetime.now()
-            processing_time = (end_time - start_time).total_seconds()
-            final_state["processing_time"] = processing_time
+            processing_time = time.perf_counter() - start
 
             # Return clean response for API
             response = {
@@ -530,27 +698,26 @@ class PostProberAI:
                 "session_id": session_id
             }
 
-    async def stream_writing_assistance(self, user_id: str, current_text: str, platform: str) -> AsyncGenerator[dict, None]:
+    async def stream_writing_assistance(self, user_id: str, current_text: str, platform: str, topic: str = "general") -> AsyncGenerator[dict, None]:
         """Streaming writing assistance for real-time UI updates"""
 
-        # This would connect to your streaming LLM endpoint
-        # For demo, we'll simulate streaming
-
-        suggestions = [
-            "Consider starting with a compelling question...",
-            "Your audience loves authentic stories...",
-            "Adding a personal experience would increase engagement...",
-            "Try including a clear call-to-action at the end..."
-        ]
-
-        for i, suggestion in enumerate(suggestions):
-            await asyncio.sleep(0.5)  # Simulate processing time
-            yield {
-                "type": "suggestion",
-                "content": suggestion,
-                "progress": (i + 1) / len(suggestions) * 100,
-                "timestamp": datetime.now().isoformat()
-            }
+        # One timestamp for the whole stream rather than one per token
+        timestamp = datetime.now().isoformat()
+
+        try:
+            # Tokens are forwarded as they arrive from the LLM
+            async for token in ai_writing_assistant_stream(current_text, platform, topic):
+                yield {
+                    "type": "token",
+                    "content": token,
+                    "timestamp": timestamp
+                }
+
+            yield {"type": "done", "prompt_type": writing_prompt_type(current_text), "timestamp": timestamp}
+
+        except Exception as e:
+            print(f"❌ Streaming writing assistance error: {e}")
+            yield {"type": "error", "content": str(e), "timestamp": timestamp}
 
 # 📖 LESSON: Example usage and testing
 async def test_postprober_ai():
@@ -608,35 +775,60 @@ async def test_postprober_ai():
         }
     ]
 
-    for test_case in test_cases:
-        print(f"\n🔍 Testing: {test_case['name']}")
-        print("-" * 30)
-
-        try:
-            result = await ai.process_request(
+    # The requests are independent, so send them all at once: the total time
+    # is that of the slowest request instead of all of them added up
+    results = await asyncio.gather(
+        *(
+            ai.process_request(
                 test_case["user_id"],
                 test_case["request_type"],
                 test_case["user_input"]
             )
+            for test_case in test_cases
+        ),
+        return_exceptions=True
+    )
 
-            print(f"✅ Success: {result['success']}")
-            if result["success"]:
-                print(f"⏱️ Processing time: {result['processing_time']:.2f}s")
-                print(f"📝 Result preview: {str(result['result'])[:100]}...")
-            else:
-                print(f"❌ Error: {result.get('error', 'Unknown error')}")
+    for test_case, result in zip(test_cases, results):
+        print(f"\n🔍 Testing: {test_case['name']}")
+        print("-" * 30)
 
-        except Exception as e:
-            print(f"❌ Test failed: {e}")
+        if isinstance(result, Exception):
+            print(f"❌ Test failed: {result}")
+            continue
+
+        print(f"✅ Success: {result['success']}")
+        if result["success"]:
+            print(f"⏱️ Processing time: {result['processing_time']:.2f}s")
+            print(f"📦 Response body: {len(to_json_bytes(result))} bytes")
+            print(f"📝 Result preview: {str(result['result'])[:100]}...")
+        else:
+            print(f"❌ Error: {result.get('error', 'Unknown error')}")
 
     # Test streaming
     print(f"\n🌊 Testing Streaming Writing Assistant")
     print("-" * 30)
 
+    print("📡 Stream: ", end="")
     async for update in ai.stream_writing_assistance("user123", "Starting my day with", "instagram"):
-        print(f"📡 Stream: {update['content'][:50]}... ({update['progress']:.0f}%)")
+        if update["type"] == "token":
+            print(update["content"], end="", flush=True)
+        elif update["type"] == "done":
+            print(f"\n✅ Stream complete ({update['prompt_type']})")
+        else:
+            print(f"\n❌ Stream error: {update['content']}")
 
 if __name__ == "__main__":
+    # 📖 LESSON: No side effects on import
+    # Importing this module (from a server, a worker or a test) only defines
+    # things. Reading the .env file and installing the cache are startup
+    # steps, done once by whatever runs the app - here, this script; in a
+    # server, its startup hook. Deployed processes usually get their
+    # environment variables from the platform and skip the .env file.
+    if "OPENAI_API_KEY" not in os.environ:
+        load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env")
+    setup_llm_cache()
+
     print("🚀 PostProber AI Integration Example")
     print("=" * 60)
 
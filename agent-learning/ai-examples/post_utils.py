@@ -0,0 +1,59 @@
+"""
+🧰 Post text helpers shared by the LangGraph lessons
+
+Pure string functions with no LangChain objects: they take and return plain
+str / int / list values and are fully type-annotated. That keeps them easy to
+test on their own, and lets them be compiled to a C extension with mypyc
+when many posts are processed in a batch:
+
+    pip install mypy
+    mypyc post_utils.py
+
+Python picks up the compiled module automatically; without it, this
+file runs as normal Python.
+"""
+
+import re
+from typing import Final, List
+
+_SENTENCE_END_RE: Final = re.compile(r"[.!?](?=\s|$)")
+_HASHTAG_RE: Final = re.compile(r"#\w[\w-]*")
+
+
+def trim_to_sentences(text: str, limit: int) -> str:
+    """Keep the leading whole sentences that fit within the limit"""
+    end = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        if match.end() > limit:
+            break
+        end = match.end()
+    return text[:end]
+
+
+def trim_to_limit(text: str, limit: int) -> str:
+    """Cut text to the limit, preferring a sentence or word boundary"""
+    if len(text) <= limit:
+        return text
+
+    # Keep whole sentences when that doesn't throw away most of the post
+    trimmed = trim_to_sentences(text, limit)
+    if len(trimmed) >= limit // 2:
+        return trimmed
+
+    cut = text[:limit]
+    word_end = cut.rfind(" ")
+    if word_end > 0:
+        return cut[:word_end].rstrip()
+    return cut
+
+
+def parse_hashtags(text: str) -> List[str]:
+    """Extract hashtags in one regex pass, dropping repeats but keeping order"""
+    return list(dict.fromkeys(_HASHTAG_RE.findall(text)))
+
+
+def compose_post(content: str, hashtags: List[str]) -> str:
+    """Join the post content and its hashtags into the final post"""
+    if not hashtags:
+        return content
+    return content + "\n\n" + " ".join(hashtags)
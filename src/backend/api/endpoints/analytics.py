@@ -4,21 +4,216 @@ Analytics & Trending API Endpoints
 Provides trending content analysis and analytics insights.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
+import asyncio
+import json
+import logging
+import os
 import time
 
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from api.http_cache import conditional_headers
+from api.middleware import VALID_PLATFORMS, INVALID_PLATFORM_DETAIL
 from tools.trending_analyzer import TrendingAnalyzerTool
 from tools.analytics_insights import AnalyticsInsightsTool
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Dashboard and trending payloads are large nested dicts; orjson encodes them
+# several times faster than the stdlib json encoder
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Initialize tools
 trending_analyzer = TrendingAnalyzerTool()
 analytics_insights = AnalyticsInsightsTool()
 
+# Analysis cache (Redis). The client connects lazily on first use; without
+# REDIS_URL analyses are cached in process instead.
+REDIS_URL = os.getenv("REDIS_URL")
+redis_client = aioredis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+
+# In-process analysis cache used without Redis, by cache key:
+# (time.time() it was generated, result), oldest first. Trending keys include
+# the requested category, so the oldest entries are dropped past this size.
+LOCAL_ANALYSIS_CACHE_SIZE = 256
+_local_analyses: Dict[str, Tuple[float, Dict]] = {}
+
+# How old a cached analysis each endpoint accepts, in seconds
+TRENDING_TTL_SHORT = 10    # analyze-content
+TRENDING_TTL_NORMAL = 30   # trending analyze, performance comparison, dashboard
+TRENDING_TTL_LONG = 60     # content ideas
+
+# Entries stay in Redis well past the freshness TTLs so a stale copy can be
+# served if the analyzer fails
+TRENDING_STALE_TTL = 600
+
+# Best posting times change over days, not minutes
+BEST_TIMES_TTL = 3600
+BEST_TIMES_STALE_TTL = 24 * 3600
+
+# Browser/CDN caching for the GET endpoints
+BEST_TIMES_CACHE_CONTROL = "public, max-age=3600, stale-while-revalidate=300"
+DASHBOARD_CACHE_CONTROL = "public, max-age=60"
+
+# Dashboard performance blocks for "no user posts", by platform:
+# (monotonic time, trending content_length it was computed from, result)
+EMPTY_PERFORMANCE_TTL = 300
+_EMPTY_PERFORMANCE_CACHE: Dict[str, Tuple[float, Dict, Dict]] = {}
+
+# Analyses currently running, by cache key. Concurrent requests for the same
+# key wait on the first caller's future instead of starting their own run.
+_inflight: Dict[str, asyncio.Future] = {}
+_inflight_lock = asyncio.Lock()
+
+
+async def _singleflight(key: str, run: Callable[[], Awaitable[Dict]]) -> Dict:
+    """
+    Run `run()` once per key at a time and share its outcome with every
+    caller that arrives while it is in flight
+
+    Args:
+        key: Identifies identical work (e.g. the trending cache key)
+        run: Starts the work; only called by the first caller
+
+    Returns:
+        The result of the shared run (its exception is re-raised to all callers)
+    """
+    async with _inflight_lock:
+        fut = _inflight.get(key)
+        leader = fut is None
+        if leader:
+            fut = asyncio.get_running_loop().create_future()
+            _inflight[key] = fut
+
+    if leader:
+        try:
+            fut.set_result(await run())
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+        finally:
+            _inflight.pop(key, None)
+
+    return await fut
+
+
+async def _read_analysis(key: str, keep: int) -> Optional[Tuple[float, Dict]]:
+    """
+    Get the (generated_at, result) entry cached under `key`, or None
+
+    Without Redis the entry comes from the in-process cache, where it is
+    kept for `keep` seconds like a Redis entry would be.
+    """
+    if redis_client is None:
+        entry = _local_analyses.get(key)
+        return entry if entry and time.time() - entry[0] <= keep else None
+
+    try:
+        payload = await redis_client.get(key)
+        if payload:
+            cached = json.loads(payload)
+            return cached["generated_at"], cached["result"]
+    except (RedisError, ValueError, KeyError) as e:
+        logger.warning("Analysis cache read failed for %s: %s", key, e)
+    return None
+
+
+async def _write_analysis(key: str, keep: int, entry: Tuple[float, Dict]) -> None:
+    """Cache a (generated_at, result) entry under `key` for `keep` seconds"""
+    if redis_client is None:
+        # Re-insert so the dict stays ordered oldest first
+        _local_analyses.pop(key, None)
+        _local_analyses[key] = entry
+        if len(_local_analyses) > LOCAL_ANALYSIS_CACHE_SIZE:
+            del _local_analyses[next(iter(_local_analyses))]
+        return
+
+    generated_at, result = entry
+    try:
+        await redis_client.setex(
+            key,
+            keep,
+            json.dumps({"generated_at": generated_at, "result": result})
+        )
+    except RedisError as e:
+        logger.warning("Analysis cache write failed for %s: %s", key, e)
+
+
+async def _cached_analysis(key: str, ttl: int, keep: int,
+                           analyze: Callable[[], Awaitable[Dict]]) -> Dict:
+    """
+    Return the analysis cached under `key` if it is at most `ttl` seconds
+    old, otherwise run `analyze()` and cache its result
+
+    Args:
+        key: Cache key for this analysis
+        ttl: Maximum age of a cached analysis for this endpoint
+        keep: How long entries are kept (as a fallback if analyze fails)
+        analyze: Runs the analyzer; concurrent misses share one run
+
+    Returns:
+        The analyzer result, fresh or from cache
+    """
+    cached = await _read_analysis(key, keep)
+    if cached is not None and time.time() - cached[0] <= ttl:
+        return cached[1]
+
+    async def run() -> Dict:
+        result = await analyze()
+        await _write_analysis(key, keep, (time.time(), result))
+        return result
+
+    try:
+        return await _singleflight(key, run)
+    except Exception:
+        if cached is not None:
+            logger.warning("Analysis failed for %s, serving cached copy", key)
+            return cached[1]
+        raise
+
+
+async def cached_trending(platform: str, category: Optional[str] = None,
+                          ttl: int = TRENDING_TTL_NORMAL) -> Dict:
+    """
+    Return trending patterns for (platform, category), reusing a cached
+    analysis that is at most `ttl` seconds old
+
+    Args:
+        platform: Platform name (already lower-cased)
+        category: Optional category filter
+        ttl: Maximum age of a cached analysis for this endpoint
+
+    Returns:
+        The analyzer result, fresh or from cache
+    """
+    return await _cached_analysis(
+        f"trending:{platform}:{category or '*'}",
+        ttl,
+        TRENDING_STALE_TTL,
+        lambda: trending_analyzer.analyze_trending_patterns(
+            platform=platform,
+            category=category
+        )
+    )
+
+
+async def cached_best_times(platform: str) -> Dict:
+    """Get best posting times for a platform, cached for BEST_TIMES_TTL seconds"""
+    return await _cached_analysis(
+        f"best-times:{platform}",
+        BEST_TIMES_TTL,
+        BEST_TIMES_STALE_TTL,
+        lambda: trending_analyzer.get_best_posting_times(platform)
+    )
+
 
 # Request Models
 class TrendingAnalysisRequest(BaseModel):
@@ -67,23 +262,19 @@ async def analyze_trending(request: TrendingAnalysisRequest) -> Dict:
             "processing_time": float
         }
     """
-    valid_platforms = ["twitter", "linkedin", "instagram", "facebook"]
-
-    if request.platform.lower() not in valid_platforms:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid platform. Must be one of: {', '.join(valid_platforms)}"
-        )
+    platform = request.platform.lower()
+    if platform not in VALID_PLATFORMS:
+        raise HTTPException(status_code=400, detail=INVALID_PLATFORM_DETAIL)
 
     try:
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
-        result = await trending_analyzer.analyze_trending_patterns(
-            platform=request.platform.lower(),
+        result = await cached_trending(
+            platform=platform,
             category=request.category
         )
 
-        processing_time = round(time.time() - start_time, 2)
+        processing_time = (time.perf_counter_ns() - start_ns) / 1e9
 
         return {
             "success": True,
@@ -96,7 +287,7 @@ async def analyze_trending(request: TrendingAnalysisRequest) -> Dict:
 
 
 @router.get("/api/trending/best-times/{platform}")
-async def get_best_posting_times(platform: str) -> Dict:
+async def get_best_posting_times(platform: str, request: Request, response: Response) -> Dict:
     """
     Get optimal posting times for a platform
 
@@ -115,20 +306,21 @@ async def get_best_posting_times(platform: str) -> Dict:
             "processing_time": float
         }
     """
-    valid_platforms = ["twitter", "linkedin", "instagram", "facebook"]
-
-    if platform.lower() not in valid_platforms:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid platform. Must be one of: {', '.join(valid_platforms)}"
-        )
-
+    # Platform is validated by PlatformValidatorMiddleware
     try:
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
-        result = await trending_analyzer.get_best_posting_times(platform.lower())
+        result = await cached_best_times(platform.lower())
 
-        processing_time = round(time.time() - start_time, 2)
+        # Weak: processing_time makes each body differ from the last
+        headers, not_modified = conditional_headers(
+            request, result, BEST_TIMES_CACHE_CONTROL, weak=True
+        )
+        if not_modified:
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+        processing_time = (time.perf_counter_ns() - start_ns) / 1e9
 
         return {
             "success": True,
@@ -165,30 +357,27 @@ async def analyze_user_content(request: ContentAnalysisRequest) -> Dict:
             "processing_time": float
         }
     """
-    valid_platforms = ["twitter", "linkedin", "instagram", "facebook"]
-
-    if request.platform.lower() not in valid_platforms:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid platform. Must be one of: {', '.join(valid_platforms)}"
-        )
+    platform = request.platform.lower()
+    if platform not in VALID_PLATFORMS:
+        raise HTTPException(status_code=400, detail=INVALID_PLATFORM_DETAIL)
 
     try:
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         # Get trending patterns for comparison
-        trending_patterns = await trending_analyzer.analyze_trending_patterns(
-            platform=request.platform.lower()
+        trending_patterns = await cached_trending(
+            platform=platform,
+            ttl=TRENDING_TTL_SHORT
         )
 
         # Analyze user content
         result = await analytics_insights.analyze_user_content(
             user_content=request.content,
-            platform=request.platform.lower(),
+            platform=platform,
             trending_patterns=trending_patterns
         )
 
-        processing_time = round(time.time() - start_time, 2)
+        processing_time = (time.perf_counter_ns() - start_ns) / 1e9
 
         return {
             "success": True,
@@ -220,31 +409,30 @@ async def generate_content_ideas(request: ContentIdeasRequest) -> Dict:
             "processing_time": float
         }
     """
-    valid_platforms = ["twitter", "linkedin", "instagram", "facebook"]
+    platform = request.platform.lower()
+    if platform not in VALID_PLATFORMS:
+        raise HTTPException(status_code=400, detail=INVALID_PLATFORM_DETAIL)
 
-    if request.platform.lower() not in valid_platforms:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid platform. Must be one of: {', '.join(valid_platforms)}"
-        )
+    category = request.category.lower()
 
     try:
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         # Get trending patterns
-        trending_patterns = await trending_analyzer.analyze_trending_patterns(
-            platform=request.platform.lower(),
-            category=request.category.lower()
+        trending_patterns = await cached_trending(
+            platform=platform,
+            category=category,
+            ttl=TRENDING_TTL_LONG
         )
 
         # Generate ideas
         result = await analytics_insights.generate_content_ideas(
-            platform=request.platform.lower(),
-            category=request.category.lower(),
+            platform=platform,
+            category=category,
             trending_patterns=trending_patterns
         )
 
-        processing_time = round(time.time() - start_time, 2)
+        processing_time = (time.perf_counter_ns() - start_ns) / 1e9
 
         return {
             "success": True,
@@ -277,21 +465,15 @@ async def compare_performance(request: PerformanceComparisonRequest) -> Dict:
             "processing_time": float
         }
     """
-    valid_platforms = ["twitter", "linkedin", "instagram", "facebook"]
-
-    if request.platform.lower() not in valid_platforms:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid platform. Must be one of: {', '.join(valid_platforms)}"
-        )
+    platform = request.platform.lower()
+    if platform not in VALID_PLATFORMS:
+        raise HTTPException(status_code=400, detail=INVALID_PLATFORM_DETAIL)
 
     try:
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         # Get trending benchmarks
-        trending_patterns = await trending_analyzer.analyze_trending_patterns(
-            platform=request.platform.lower()
-        )
+        trending_patterns = await cached_trending(platform=platform)
 
         # Compare performance
         result = await analytics_insights.compare_performance(
@@ -299,7 +481,7 @@ async def compare_performance(request: PerformanceComparisonRequest) -> Dict:
             trending_benchmarks=trending_patterns
         )
 
-        processing_time = round(time.time() - start_time, 2)
+        processing_time = (time.perf_counter_ns() - start_ns) / 1e9
 
         return {
             "success": True,
@@ -313,7 +495,7 @@ async def compare_performance(request: PerformanceComparisonRequest) -> Dict:
 
 # Combined endpoint for dashboard
 @router.get("/api/analytics/dashboard/{platform}")
-async def get_analytics_dashboard(platform: str) -> Dict:
+async def get_analytics_dashboard(platform: str, request: Request, response: Response) -> Dict:
     """
     Get complete analytics dashboard data
 
@@ -331,35 +513,47 @@ async def get_analytics_dashboard(platform: str) -> Dict:
             "processing_time": float
         }
     """
-    valid_platforms = ["twitter", "linkedin", "instagram", "facebook"]
-
-    if platform.lower() not in valid_platforms:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid platform. Must be one of: {', '.join(valid_platforms)}"
-        )
+    # Platform is validated by PlatformValidatorMiddleware
+    platform = platform.lower()
 
     try:
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         # Get all analytics data in parallel
-        import asyncio
-
-        trending_task = trending_analyzer.analyze_trending_patterns(platform.lower())
-        times_task = trending_analyzer.get_best_posting_times(platform.lower())
+        trending_task = cached_trending(platform)
+        times_task = cached_best_times(platform)
 
         trending_result, times_result = await asyncio.gather(
             trending_task,
             times_task
         )
 
-        # Get performance comparison (with empty user posts for now)
-        performance_result = await analytics_insights.compare_performance(
-            user_posts=[],
-            trending_benchmarks=trending_result
+        # The rest of the dashboard is derived from these two results
+        headers, not_modified = conditional_headers(
+            request,
+            {"trending": trending_result, "best_times": times_result},
+            DASHBOARD_CACHE_CONTROL,
+            weak=True
         )
-
-        processing_time = round(time.time() - start_time, 2)
+        if not_modified:
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+        # Get performance comparison (with empty user posts for now). With no
+        # posts it only depends on the trending content length, so reuse it.
+        content_length = trending_result.get("content_length", {})
+        cached = _EMPTY_PERFORMANCE_CACHE.get(platform)
+        if (cached and time.monotonic() - cached[0] < EMPTY_PERFORMANCE_TTL
+                and cached[1] == content_length):
+            performance_result = cached[2]
+        else:
+            performance_result = await analytics_insights.compare_performance(
+                user_posts=[],
+                trending_benchmarks=trending_result
+            )
+            _EMPTY_PERFORMANCE_CACHE[platform] = (time.monotonic(), content_length, performance_result)
+
+        processing_time = (time.perf_counter_ns() - start_ns) / 1e9
 
         return {
             "success": True,
@@ -2,38 +2,73 @@
 OAuth authentication endpoints for social media platforms
 """
 from fastapi import APIRouter, HTTPException, Request, Response
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, ORJSONResponse
 from typing import Dict, Optional
+from secrets import token_urlsafe
+from urllib.parse import urlencode
+from functools import lru_cache
 import logging
-import sys
-from pathlib import Path
-
-# Ensure backend package is importable when running as a script
-BACKEND_DIR = Path(__file__).resolve().parents[3]
-if str(BACKEND_DIR) not in sys.path:
-    sys.path.append(str(BACKEND_DIR))
+import os
+import time
 
+from auth.oauth_handlers import OAuthHandler
 from auth.twitter_oauth import TwitterOAuth
 from auth.linkedin_oauth import LinkedInOAuth
 from auth.instagram_oauth import InstagramOAuth
 from auth.facebook_oauth import FacebookOAuth
-from database.models import db
+from database.models import db_async
+from api.http_cache import conditional_headers
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth")
 
-# Initialize OAuth handlers
-oauth_handlers = {
-    'twitter': TwitterOAuth(),
-    'linkedin': LinkedInOAuth(),
-    'instagram': InstagramOAuth(),
-    'facebook': FacebookOAuth()
+# OAuth handler classes by platform
+OAUTH_HANDLER_CLASSES = {
+    'twitter': TwitterOAuth,
+    'linkedin': LinkedInOAuth,
+    'instagram': InstagramOAuth,
+    'facebook': FacebookOAuth
+}
+
+# Platforms in the order /status reports them
+PLATFORMS = tuple(OAUTH_HANDLER_CLASSES)
+PLATFORM_DISPLAY_NAMES = {name: name.capitalize() for name in PLATFORMS}
+
+
+@lru_cache(maxsize=None)
+def get_oauth_handler(platform: str) -> OAuthHandler:
+    """Create the platform's OAuth handler on first use and reuse it afterwards"""
+    return OAUTH_HANDLER_CLASSES[platform]()
+
+# Frontend page the OAuth callback sends the user back to
+FRONTEND_ACCOUNTS_URL = os.getenv("FRONTEND_URL", "http://localhost:5173").rstrip("/") + "/accounts"
+
+# Callback redirects that don't depend on the request, built once
+_CONNECTED_URLS = {
+    name: f"{FRONTEND_ACCOUNTS_URL}?{urlencode({'connected': name})}" for name in PLATFORMS
+}
+_MISSING_PARAMS_URL = f"{FRONTEND_ACCOUNTS_URL}?{urlencode({'error': 'Missing authorization code or state'})}"
+
+
+def accounts_error_redirect(message: str) -> RedirectResponse:
+    """Redirect to the frontend accounts page with a URL-encoded error"""
+    return RedirectResponse(url=f"{FRONTEND_ACCOUNTS_URL}?{urlencode({'error': message})}")
+
+
+# /status is polled; clients must revalidate, and get a 304 while nothing changed
+STATUS_CACHE_CONTROL = "private, no-cache"
+
+# Shared, never-mutated building blocks for /status responses
+_DISCONNECTED = {'connected': False}
+_EMPTY_STATUS = {
+    "connected_platforms": [],
+    "platforms": {name: _DISCONNECTED for name in PLATFORMS}
 }
 
 
-def get_or_create_user(request: Request) -> int:
+async def get_or_create_user(request: Request) -> int:
     """
     Get or create user based on session
 
@@ -47,16 +82,10 @@ def get_or_create_user(request: Request) -> int:
 
     if not session_id:
         # Generate new session ID
-        import secrets
-        session_id = secrets.token_urlsafe(32)
+        session_id = token_urlsafe(32)
 
     # Get or create user
-    user = db.get_user_by_session(session_id)
-    if not user:
-        user_id = db.create_user(session_id)
-    else:
-        user_id = user['id']
-        db.update_user_activity(user_id)
+    user_id = await db_async.upsert_user_by_session(session_id)
 
     return user_id, session_id
 
@@ -72,14 +101,12 @@ async def platform_login(platform: str, request: Request):
     Returns:
         Redirect to platform authorization URL
     """
-    if platform not in oauth_handlers:
-        raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
-
+    # Platform is validated by PlatformValidatorMiddleware
     try:
-        handler = oauth_handlers[platform]
+        handler = get_oauth_handler(platform)
 
         # Get or create user
-        user_id, session_id = get_or_create_user(request)
+        user_id, session_id = await get_or_create_user(request)
 
         # Generate state for CSRF protection
         state = handler.generate_state()
@@ -90,7 +117,7 @@ async def platform_login(platform: str, request: Request):
             code_verifier, code_challenge = handler.generate_pkce_pair()
 
             # Store state and code verifier in database
-            db.create_oauth_state(
+            await db_async.create_oauth_state(
                 state=state,
                 user_id=user_id,
                 platform=platform,
@@ -100,7 +127,7 @@ async def platform_login(platform: str, request: Request):
             auth_url = handler.get_authorization_url(state, code_challenge=code_challenge)
         else:
             # Other platforms use standard OAuth
-            db.create_oauth_state(
+            await db_async.create_oauth_state(
                 state=state,
                 user_id=user_id,
                 platform=platform
@@ -121,7 +148,7 @@ async def platform_login(platform: str, request: Request):
         return response
 
     except Exception as e:
-        logger.error(f"Error initiating {platform} OAuth: {str(e)}")
+        logger.error("Error initiating %s OAuth: %s", platform, e)
         raise HTTPException(status_code=500, detail=f"Failed to initiate OAuth: {str(e)}")
 
 
@@ -147,22 +174,21 @@ async def platform_callback(
     Returns:
         Redirect to frontend with success/error
     """
-    if platform not in oauth_handlers:
-        raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
+    # Platform is validated by PlatformValidatorMiddleware
 
     # Check if platform returned an error
     if error:
         error_msg = error_description or error
-        logger.error(f"OAuth error from {platform}: {error_msg}")
-        return RedirectResponse(url=f"http://localhost:5173/accounts?error={error_msg}")
+        logger.error("OAuth error from %s: %s", platform, error_msg)
+        return accounts_error_redirect(error_msg)
 
     # Check for required parameters
     if not code or not state:
-        return RedirectResponse(url=f"http://localhost:5173/accounts?error=Missing authorization code or state")
+        return RedirectResponse(url=_MISSING_PARAMS_URL)
 
     try:
         # Verify state
-        oauth_state = db.get_oauth_state(state)
+        oauth_state = await db_async.get_oauth_state(state)
         if not oauth_state:
             raise HTTPException(status_code=400, detail="Invalid or expired state")
 
@@ -170,7 +196,7 @@ async def platform_callback(
             raise HTTPException(status_code=400, detail="Platform mismatch")
 
         user_id = oauth_state['user_id']
-        handler = oauth_handlers[platform]
+        handler = get_oauth_handler(platform)
 
         # Exchange code for token
         if platform == 'twitter':
@@ -219,7 +245,7 @@ async def platform_callback(
             platform_username = f"{first_name} {last_name}".strip() or platform_user_id
 
         # Save token to database
-        db.save_platform_token(
+        await db_async.save_platform_token(
             user_id=user_id,
             platform=platform,
             access_token=access_token,
@@ -232,15 +258,15 @@ async def platform_callback(
         )
 
         # Delete used state
-        db.delete_oauth_state(state)
+        await db_async.delete_oauth_state(state)
 
         # Redirect to frontend success page
-        return RedirectResponse(url=f"http://localhost:5173/accounts?connected={platform}")
+        return RedirectResponse(url=_CONNECTED_URLS[platform])
 
     except Exception as e:
-        logger.error(f"Error in {platform} OAuth callback: {str(e)}")
+        logger.error("Error in %s OAuth callback: %s", platform, e)
         # Redirect to frontend error page
-        return RedirectResponse(url=f"http://localhost:5173/accounts?error={str(e)}")
+        return accounts_error_redirect(str(e))
 
 
 @router.get("/status")
@@ -255,65 +281,63 @@ async def auth_status(request: Request):
         # Get user from session
         session_id = request.cookies.get('session_id')
         if not session_id:
-            return JSONResponse(content={
-                "connected_platforms": [],
-                "platforms": {
-                    'twitter': {'connected': False},
-                    'linkedin': {'connected': False},
-                    'instagram': {'connected': False},
-                    'facebook': {'connected': False}
-                }
-            })
-
-        user = db.get_user_by_session(session_id)
+            return ORJSONResponse(content=_EMPTY_STATUS)
+
+        # The response only changes when a token is added, refreshed or
+        # removed. A client polling with an ETag usually has the current
+        # status, so check the token version cheaply before loading tokens
+        if request.headers.get('if-none-match'):
+            version = await db_async.get_session_token_version(session_id)
+            if not version:
+                return ORJSONResponse(content=_EMPTY_STATUS)
+
+            headers, not_modified = conditional_headers(
+                request, [session_id, *version], STATUS_CACHE_CONTROL
+            )
+            if not_modified:
+                return Response(status_code=304, headers=headers)
+
+        # Get the user, their platform tokens and the tokens' version in one
+        # query, so the ETag always describes the body it is sent with
+        user, platforms, version = await db_async.get_platforms_by_session(session_id)
         if not user:
-            return JSONResponse(content={
-                "connected_platforms": [],
-                "platforms": {
-                    'twitter': {'connected': False},
-                    'linkedin': {'connected': False},
-                    'instagram': {'connected': False},
-                    'facebook': {'connected': False}
-                }
-            })
-
-        # Get all platform tokens for user
-        platforms = db.get_user_platforms(user['id'])
+            return ORJSONResponse(content=_EMPTY_STATUS)
 
-        # Build response
-        connected_platforms = []
-        platform_status = {}
-
-        for platform_name in ['twitter', 'linkedin', 'instagram', 'facebook']:
-            # Find token for this platform
-            platform_token = next((p for p in platforms if p['platform'] == platform_name), None)
-
-            if platform_token:
-                connected_platforms.append({
-                    'id': platform_name,
-                    'name': platform_name.capitalize(),
-                    'username': platform_token.get('platform_username'),
-                    'user_id': platform_token.get('platform_user_id'),
-                    'connected_at': platform_token.get('created_at')
-                })
-
-                platform_status[platform_name] = {
-                    'connected': True,
-                    'username': platform_token.get('platform_username'),
-                    'expires_at': platform_token.get('expires_at')
-                }
-            else:
-                platform_status[platform_name] = {
-                    'connected': False
-                }
+        headers, _ = conditional_headers(
+            request, [session_id, *version], STATUS_CACHE_CONTROL
+        )
+
+        tokens_by_platform = {p['platform']: p for p in platforms}
 
-        return JSONResponse(content={
+        # Build response
+        connected_platforms = [
+            {
+                'id': name,
+                'name': PLATFORM_DISPLAY_NAMES[name],
+                'username': token.get('platform_username'),
+                'user_id': token.get('platform_user_id'),
+                'connected_at': token.get('created_at')
+            }
+            for name in PLATFORMS
+            if (token := tokens_by_platform.get(name))
+        ]
+
+        platform_status = {
+            name: {
+                'connected': True,
+                'username': token.get('platform_username'),
+                'expires_at': token.get('expires_at')
+            } if (token := tokens_by_platform.get(name)) else _DISCONNECTED
+            for name in PLATFORMS
+        }
+
+        return ORJSONResponse(content={
             "connected_platforms": connected_platforms,
             "platforms": platform_status
-        })
+        }, headers=headers)
 
     except Exception as e:
-        logger.error(f"Error getting auth status: {str(e)}")
+        logger.error("Error getting auth status: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -328,36 +352,34 @@ async def platform_disconnect(platform: str, request: Request):
     Returns:
         Success message
     """
-    if platform not in oauth_handlers:
-        raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
-
+    # Platform is validated by PlatformValidatorMiddleware
     try:
         # Get user from session
         session_id = request.cookies.get('session_id')
         if not session_id:
             raise HTTPException(status_code=401, detail="Not authenticated")
 
-        user = db.get_user_by_session(session_id)
+        user = await db_async.get_user_by_session(session_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
 
         # Get platform token
-        platform_token = db.get_platform_token(user['id'], platform)
+        platform_token = await db_async.get_platform_token(user['id'], platform)
         if not platform_token:
             raise HTTPException(status_code=404, detail=f"{platform} not connected")
 
         # Revoke token on platform
-        handler = oauth_handlers[platform]
+        handler = get_oauth_handler(platform)
         try:
             await handler.revoke_token(platform_token['access_token'])
         except Exception as e:
-            logger.warning(f"Failed to revoke {platform} token: {str(e)}")
+            logger.warning("Failed to revoke %s token: %s", platform, e)
             # Continue anyway to delete from database
 
         # Delete token from database
-        db.delete_platform_token(user['id'], platform)
+        await db_async.delete_platform_token(user['id'], platform)
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "message": f"Successfully disconnected {platform}"
         })
@@ -365,7 +387,7 @@ async def platform_disconnect(platform: str, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error disconnecting {platform}: {str(e)}")
+        logger.error("Error disconnecting %s: %s", platform, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -380,55 +402,48 @@ async def get_platform_token(platform: str, request: Request):
     Returns:
         Token data
     """
-    if platform not in oauth_handlers:
-        raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
-
+    # Platform is validated by PlatformValidatorMiddleware
     try:
         # Get user from session
         session_id = request.cookies.get('session_id')
         if not session_id:
             raise HTTPException(status_code=401, detail="Not authenticated")
 
-        user = db.get_user_by_session(session_id)
+        user = await db_async.get_user_by_session(session_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
 
         # Get platform token
-        platform_token = db.get_platform_token(user['id'], platform)
+        platform_token = await db_async.get_platform_token(user['id'], platform)
         if not platform_token:
             raise HTTPException(status_code=404, detail=f"{platform} not connected")
 
         # Check if token is expired and refresh if needed
-        from datetime import datetime
-        if platform_token.get('expires_at'):
-            expires_at = datetime.fromisoformat(platform_token['expires_at'])
-            if datetime.now() >= expires_at:
-                # Token expired, try to refresh
-                handler = oauth_handlers[platform]
-                if platform_token.get('refresh_token'):
-                    try:
-                        new_token_data = await handler.refresh_access_token(platform_token['refresh_token'])
-
-                        # Update token in database
-                        db.save_platform_token(
-                            user_id=user['id'],
-                            platform=platform,
-                            access_token=new_token_data['access_token'],
-                            refresh_token=new_token_data.get('refresh_token') or platform_token['refresh_token'],
-                            expires_in=new_token_data.get('expires_in'),
-                            platform_user_id=platform_token['platform_user_id'],
-                            platform_username=platform_token['platform_username']
-                        )
-
-                        # Get updated token
-                        platform_token = db.get_platform_token(user['id'], platform)
-                    except Exception as e:
-                        logger.error(f"Failed to refresh {platform} token: {str(e)}")
-                        raise HTTPException(status_code=401, detail="Token expired and refresh failed")
-                else:
-                    raise HTTPException(status_code=401, detail="Token expired, please reconnect")
-
-        return JSONResponse(content={
+        expires_at_epoch = platform_token.get('expires_at_epoch')
+        if expires_at_epoch and time.time() >= expires_at_epoch:
+            # Token expired, try to refresh
+            handler = get_oauth_handler(platform)
+            if platform_token.get('refresh_token'):
+                try:
+                    new_token_data = await handler.refresh_access_token(platform_token['refresh_token'])
+
+                    # Update token in database (returns the updated row)
+                    platform_token = await db_async.save_platform_token(
+                        user_id=user['id'],
+                        platform=platform,
+                        access_token=new_token_data['access_token'],
+                        refresh_token=new_token_data.get('refresh_token') or platform_token['refresh_token'],
+                        expires_in=new_token_data.get('expires_in'),
+                        platform_user_id=platform_token['platform_user_id'],
+                        platform_username=platform_token['platform_username']
+                    )
+                except Exception as e:
+                    logger.error("Failed to refresh %s token: %s", platform, e)
+                    raise HTTPException(status_code=401, detail="Token expired and refresh failed")
+            else:
+                raise HTTPException(status_code=401, detail="Token expired, please reconnect")
+
+        return ORJSONResponse(content={
             "platform": platform,
             "access_token": platform_token['access_token'],
             "platform_user_id": platform_token['platform_user_id'],
@@ -439,5 +454,5 @@ async def get_platform_token(platform: str, request: Request):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting {platform} token: {str(e)}")
+        logger.error("Error getting %s token: %s", platform, e)
         raise HTTPException(status_code=500, detail=str(e))
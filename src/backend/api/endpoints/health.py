@@ -7,6 +7,7 @@ Provides real-time platform health monitoring and alerting.
 from fastapi import APIRouter, WebSocket, HTTPException
 from typing import Dict, List
 from datetime import datetime
+import time
 
 from jobs.health_scheduler import health_scheduler
 from services.websocket_manager import manager as ws_manager, handle_websocket_connection
@@ -121,7 +122,6 @@ async def trigger_health_check() -> Dict:
         }
     """
     try:
-        import time
         start_time = time.time()
 
         # Run health check
@@ -0,0 +1,40 @@
+"""
+HTTP Caching Helpers
+
+ETag / If-None-Match support shared by the endpoint routers.
+"""
+
+import hashlib
+from typing import Dict, Tuple
+
+import orjson
+from fastapi import Request
+
+
+def conditional_headers(request: Request, basis, cache_control: str,
+                        weak: bool = False) -> Tuple[Dict[str, str], bool]:
+    """
+    Build ETag and Cache-Control headers for a response derived from `basis`
+
+    Args:
+        request: Incoming request (checked for If-None-Match)
+        basis: JSON-serializable data that determines the response body
+        cache_control: Cache-Control header value
+        weak: Use a weak ETag (body is derived from basis, not byte-identical)
+
+    Returns:
+        (headers, not_modified) - not_modified is True when the client's
+        cached copy is current and a 304 can be sent instead of the body
+    """
+    digest = hashlib.blake2b(orjson.dumps(basis), digest_size=16).hexdigest()
+    etag = f'W/"{digest}"' if weak else f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    # If-None-Match uses weak comparison, so ignore any W/ prefixes
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        client_tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in client_tags or f'"{digest}"' in client_tags:
+            return headers, True
+
+    return headers, False
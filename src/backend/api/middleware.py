@@ -0,0 +1,71 @@
+"""
+API Middleware
+
+Pure-ASGI middleware shared by the endpoint routers. These classes work on
+the raw ASGI scope, so they add no Request/Response objects to each request.
+"""
+
+import json
+from typing import Optional
+
+VALID_PLATFORMS = frozenset(("twitter", "linkedin", "instagram", "facebook"))
+INVALID_PLATFORM_DETAIL = f"Invalid platform. Must be one of: {', '.join(sorted(VALID_PLATFORMS))}"
+
+# Analytics routes ending in /{platform}
+_PLATFORM_SUFFIX_ROUTES = frozenset(("/api/trending/best-times", "/api/analytics/dashboard"))
+
+# Auth routes shaped /api/auth/{platform}/{action}
+_AUTH_PREFIX = "/api/auth/"
+_AUTH_ACTIONS = frozenset(("login", "callback", "disconnect", "token"))
+
+
+def invalid_platform_detail(path: str) -> Optional[str]:
+    """
+    Check the {platform} segment of a request path
+
+    Args:
+        path: ASGI scope path
+
+    Returns:
+        Error detail if the path names an unknown platform, otherwise None
+    """
+    prefix, _, platform = path.rpartition("/")
+    if prefix in _PLATFORM_SUFFIX_ROUTES:
+        return None if platform.lower() in VALID_PLATFORMS else INVALID_PLATFORM_DETAIL
+
+    if path.startswith(_AUTH_PREFIX):
+        platform, _, action = path[len(_AUTH_PREFIX):].partition("/")
+        if action in _AUTH_ACTIONS and platform not in VALID_PLATFORMS:
+            return f"Unsupported platform: {platform}"
+
+    return None
+
+
+class PlatformValidatorMiddleware:
+    """
+    Reject requests for unknown platforms before they reach a handler
+
+    Only platforms in the URL path are checked; platforms sent in a request
+    body are still validated by their handlers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            detail = invalid_platform_detail(scope["path"])
+            if detail is not None:
+                body = json.dumps({"detail": detail}).encode()
+                await send({
+                    "type": "http.response.start",
+                    "status": 400,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+
+        await self.app(scope, receive, send)
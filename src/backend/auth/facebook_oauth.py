@@ -2,7 +2,6 @@
 Facebook OAuth handler using Graph API
 """
 import os
-import aiohttp
 from typing import Dict
 from .oauth_handlers import OAuthHandler
 
@@ -59,7 +58,7 @@ class FacebookOAuth(OAuthHandler):
             'code': code
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(self.token_url, params=params) as response:
                 if response.status == 200:
                     return await response.json()
@@ -84,7 +83,7 @@ class FacebookOAuth(OAuthHandler):
             'fb_exchange_token': short_lived_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(self.token_url, params=params) as response:
                 if response.status == 200:
                     return await response.json()
@@ -118,7 +117,7 @@ class FacebookOAuth(OAuthHandler):
             'Authorization': f'Bearer {access_token}'
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             # Get Facebook user info
             async with session.get(
                 'https://graph.facebook.com/v18.0/me',
@@ -156,7 +155,7 @@ class FacebookOAuth(OAuthHandler):
         Returns:
             True if successful, False otherwise
         """
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.delete(
                 f'https://graph.facebook.com/v18.0/me/permissions',
                 params={'access_token': token}
@@ -184,7 +183,7 @@ class FacebookOAuth(OAuthHandler):
         if link:
             params['link'] = link
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(
                 f'https://graph.facebook.com/v18.0/{page_id}/feed',
                 params=params
@@ -216,7 +215,7 @@ class FacebookOAuth(OAuthHandler):
         if caption:
             params['caption'] = caption
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(
                 f'https://graph.facebook.com/v18.0/{page_id}/photos',
                 params=params
@@ -245,7 +244,7 @@ class FacebookOAuth(OAuthHandler):
             'access_token': page_access_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(
                 f'https://graph.facebook.com/v18.0/{page_id}/posts',
                 params=params
@@ -274,7 +273,7 @@ class FacebookOAuth(OAuthHandler):
             'access_token': page_access_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(
                 f'https://graph.facebook.com/v18.0/{page_id}/insights',
                 params=params
@@ -301,7 +300,7 @@ class FacebookOAuth(OAuthHandler):
             'access_token': page_access_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(
                 f'https://graph.facebook.com/v18.0/{post_id}/insights',
                 params=params
@@ -327,7 +326,7 @@ class FacebookOAuth(OAuthHandler):
             'access_token': access_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.delete(
                 f'https://graph.facebook.com/v18.0/{post_id}',
                 params=params
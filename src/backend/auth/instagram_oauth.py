@@ -3,7 +3,6 @@ Instagram OAuth handler using Facebook Graph API
 Requires Instagram Business Account connected to Facebook Page
 """
 import os
-import aiohttp
 from typing import Dict
 from .oauth_handlers import OAuthHandler
 
@@ -58,7 +57,7 @@ class InstagramOAuth(OAuthHandler):
             'code': code
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(self.token_url, params=params) as response:
                 if response.status == 200:
                     return await response.json()
@@ -83,7 +82,7 @@ class InstagramOAuth(OAuthHandler):
             'fb_exchange_token': short_lived_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(self.token_url, params=params) as response:
                 if response.status == 200:
                     return await response.json()
@@ -119,7 +118,7 @@ class InstagramOAuth(OAuthHandler):
         }
 
         # First, get Facebook user info
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(
                 'https://graph.facebook.com/v18.0/me',
                 headers=headers,
@@ -188,7 +187,7 @@ class InstagramOAuth(OAuthHandler):
         Returns:
             True if successful, False otherwise
         """
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.delete(
                 f'https://graph.facebook.com/v18.0/me/permissions',
                 params={'access_token': token}
@@ -214,7 +213,7 @@ class InstagramOAuth(OAuthHandler):
             'access_token': page_access_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(
                 f'https://graph.facebook.com/v18.0/{ig_account_id}/media',
                 params=params
@@ -242,7 +241,7 @@ class InstagramOAuth(OAuthHandler):
             'access_token': page_access_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(
                 f'https://graph.facebook.com/v18.0/{ig_account_id}/media_publish',
                 params=params
@@ -271,7 +270,7 @@ class InstagramOAuth(OAuthHandler):
             'access_token': page_access_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(
                 f'https://graph.facebook.com/v18.0/{ig_account_id}/media',
                 params=params
@@ -300,7 +299,7 @@ class InstagramOAuth(OAuthHandler):
             'access_token': page_access_token
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(
                 f'https://graph.facebook.com/v18.0/{ig_account_id}/insights',
                 params=params
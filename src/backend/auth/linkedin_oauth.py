@@ -2,7 +2,6 @@
 LinkedIn OAuth 2.0 handler (3-legged OAuth)
 """
 import os
-import aiohttp
 from typing import Dict
 from .oauth_handlers import OAuthHandler
 
@@ -66,7 +65,7 @@ class LinkedInOAuth(OAuthHandler):
             'redirect_uri': self.redirect_uri
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(self.token_url, headers=headers, data=data) as response:
                 if response.status == 200:
                     return await response.json()
@@ -104,7 +103,7 @@ class LinkedInOAuth(OAuthHandler):
             'Authorization': f'Bearer {access_token}'
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(self.user_info_url, headers=headers) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -171,7 +170,7 @@ class LinkedInOAuth(OAuthHandler):
             }
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(
                 'https://api.linkedin.com/v2/ugcPosts',
                 headers=headers,
@@ -207,7 +206,7 @@ class LinkedInOAuth(OAuthHandler):
             'count': count
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(
                 'https://api.linkedin.com/v2/ugcPosts',
                 headers=headers,
@@ -235,7 +234,7 @@ class LinkedInOAuth(OAuthHandler):
             'X-Restli-Protocol-Version': '2.0.0'
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(
                 f'https://api.linkedin.com/v2/networkSizes/{person_urn}',
                 headers=headers,
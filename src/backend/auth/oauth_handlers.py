@@ -5,10 +5,33 @@ import secrets
 import hashlib
 import base64
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, Tuple
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
 from urllib.parse import urlencode
 import os
 
+import aiohttp
+
+# One HTTP session shared by every handler, so connections (and their TLS
+# handshakes) to each platform's API are pooled across requests
+_http_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the shared HTTP session, creating it on first use"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+    return _http_session
+
+
+async def close_http_session():
+    """Close the shared HTTP session (call on application shutdown)"""
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
 
 class OAuthHandler(ABC):
     """Base class for OAuth 2.0 handlers"""
@@ -65,6 +88,16 @@ class OAuthHandler(ABC):
         """Get redirect URI from environment variables"""
         pass
 
+    @asynccontextmanager
+    async def http_session(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """
+        Borrow the shared HTTP session
+
+        Used as `async with self.http_session() as session:`; unlike a fresh
+        aiohttp.ClientSession, leaving the block does not close it.
+        """
+        yield get_http_session()
+
     def generate_state(self) -> str:
         """
         Generate secure random state for CSRF protection
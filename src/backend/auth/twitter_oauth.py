@@ -2,7 +2,6 @@
 Twitter/X OAuth 2.0 handler with PKCE
 """
 import os
-import aiohttp
 import base64
 from typing import Dict
 from .oauth_handlers import OAuthHandler
@@ -100,7 +99,7 @@ class TwitterOAuth(OAuthHandler):
             'code_verifier': code_verifier
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(self.token_url, headers=headers, data=data) as response:
                 if response.status == 200:
                     return await response.json()
@@ -132,7 +131,7 @@ class TwitterOAuth(OAuthHandler):
             'grant_type': 'refresh_token'
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(self.token_url, headers=headers, data=data) as response:
                 if response.status == 200:
                     return await response.json()
@@ -158,7 +157,7 @@ class TwitterOAuth(OAuthHandler):
             'user.fields': 'id,name,username,profile_image_url,description'
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(self.user_info_url, headers=headers, params=params) as response:
                 if response.status == 200:
                     result = await response.json()
@@ -191,7 +190,7 @@ class TwitterOAuth(OAuthHandler):
             'token_type_hint': 'access_token'
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(self.revoke_url, headers=headers, data=data) as response:
                 return response.status == 200
 
@@ -215,7 +214,7 @@ class TwitterOAuth(OAuthHandler):
             'text': text
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.post(
                 'https://api.twitter.com/2/tweets',
                 headers=headers,
@@ -248,7 +247,7 @@ class TwitterOAuth(OAuthHandler):
             'tweet.fields': 'created_at,public_metrics,text'
         }
 
-        async with aiohttp.ClientSession() as session:
+        async with self.http_session() as session:
             async with session.get(
                 f'https://api.twitter.com/2/users/{user_id}/tweets',
                 headers=headers,
@@ -1,9 +1,11 @@
 """
 Database models for OAuth token storage and user management
 """
+import asyncio
 import sqlite3
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from pathlib import Path
 import json
 
@@ -45,6 +47,7 @@ class Database:
                 refresh_token TEXT,
                 token_type TEXT DEFAULT 'Bearer',
                 expires_at TIMESTAMP,
+                expires_at_epoch INTEGER,
                 scope TEXT,
                 platform_user_id TEXT,
                 platform_username TEXT,
@@ -74,9 +77,28 @@ class Database:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_platform_tokens_user_platform ON platform_tokens(user_id, platform)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_oauth_states_state ON oauth_states(state)")
 
+        self._migrate_expires_at_epoch(cursor)
+
         conn.commit()
         conn.close()
 
+    def _migrate_expires_at_epoch(self, cursor):
+        """Add platform_tokens.expires_at_epoch to older databases and backfill it"""
+        columns = {row['name'] for row in cursor.execute("PRAGMA table_info(platform_tokens)")}
+        if 'expires_at_epoch' in columns:
+            return
+
+        cursor.execute("ALTER TABLE platform_tokens ADD COLUMN expires_at_epoch INTEGER")
+
+        # expires_at holds naive local times, so convert in Python rather than with strftime('%s')
+        rows = cursor.execute(
+            "SELECT id, expires_at FROM platform_tokens WHERE expires_at IS NOT NULL"
+        ).fetchall()
+        cursor.executemany(
+            "UPDATE platform_tokens SET expires_at_epoch = ? WHERE id = ?",
+            [(int(datetime.fromisoformat(row['expires_at']).timestamp()), row['id']) for row in rows]
+        )
+
     # User Management
     def create_user(self, session_id: str) -> int:
         """Create a new user with session ID"""
@@ -108,6 +130,20 @@ class Database:
         conn.commit()
         conn.close()
 
+    def upsert_user_by_session(self, session_id: str) -> int:
+        """Create the session's user, or mark an existing one active, in one statement"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO users (session_id, last_active) VALUES (?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET last_active = excluded.last_active
+            RETURNING id
+        """, (session_id, datetime.now()))
+        user_id = cursor.fetchone()[0]
+        conn.commit()
+        conn.close()
+        return user_id
+
     # Platform Token Management
     def save_platform_token(
         self,
@@ -121,14 +157,16 @@ class Database:
         platform_user_id: Optional[str] = None,
         platform_username: Optional[str] = None,
         platform_user_data: Optional[Dict] = None
-    ) -> int:
-        """Save or update platform token"""
+    ) -> Dict:
+        """Save or update platform token, returning the stored row"""
         conn = self.get_connection()
         cursor = conn.cursor()
 
         expires_at = None
+        expires_at_epoch = None
         if expires_in:
             expires_at = datetime.now() + timedelta(seconds=expires_in)
+            expires_at_epoch = int(time.time()) + expires_in
 
         user_data_json = json.dumps(platform_user_data) if platform_user_data else None
 
@@ -147,6 +185,7 @@ class Database:
                     refresh_token = ?,
                     token_type = ?,
                     expires_at = ?,
+                    expires_at_epoch = ?,
                     scope = ?,
                     platform_user_id = ?,
                     platform_username = ?,
@@ -154,7 +193,7 @@ class Database:
                     updated_at = ?
                 WHERE user_id = ? AND platform = ?
             """, (
-                access_token, refresh_token, token_type, expires_at, scope,
+                access_token, refresh_token, token_type, expires_at, expires_at_epoch, scope,
                 platform_user_id, platform_username, user_data_json,
                 datetime.now(), user_id, platform
             ))
@@ -164,19 +203,25 @@ class Database:
             cursor.execute("""
                 INSERT INTO platform_tokens (
                     user_id, platform, access_token, refresh_token, token_type,
-                    expires_at, scope, platform_user_id, platform_username,
+                    expires_at, expires_at_epoch, scope, platform_user_id, platform_username,
                     platform_user_data, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 user_id, platform, access_token, refresh_token, token_type,
-                expires_at, scope, platform_user_id, platform_username,
+                expires_at, expires_at_epoch, scope, platform_user_id, platform_username,
                 user_data_json, datetime.now()
             ))
             token_id = cursor.lastrowid
 
+        # Read the row back on the same connection so callers don't need a second query
+        cursor.execute("SELECT * FROM platform_tokens WHERE id = ?", (token_id,))
+        token_data = dict(cursor.fetchone())
         conn.commit()
         conn.close()
-        return token_id
+
+        if token_data.get('platform_user_data'):
+            token_data['platform_user_data'] = json.loads(token_data['platform_user_data'])
+        return token_data
 
     def get_platform_token(self, user_id: int, platform: str) -> Optional[Dict]:
         """Get platform token for user"""
@@ -215,6 +260,65 @@ class Database:
             platforms.append(platform_data)
         return platforms
 
+    def get_platforms_by_session(
+        self, session_id: str
+    ) -> Tuple[Optional[Dict], List[Dict], Optional[Tuple[int, Optional[str], int]]]:
+        """
+        Get the session's user, all of their platform tokens and the tokens'
+        version (as returned by get_session_token_version) in one query
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT u.id AS u_id, u.session_id AS u_session_id,
+                   u.created_at AS u_created_at, u.last_active AS u_last_active,
+                   MAX(p.updated_at) OVER () AS u_tokens_updated_at,
+                   COUNT(p.id) OVER () AS u_token_count,
+                   p.*
+            FROM users u
+            LEFT JOIN platform_tokens p ON p.user_id = u.id
+            WHERE u.session_id = ?
+        """, (session_id,))
+        rows = cursor.fetchall()
+        conn.close()
+
+        if not rows:
+            return None, [], None
+
+        first = rows[0]
+        user = {
+            'id': first['u_id'],
+            'session_id': first['u_session_id'],
+            'created_at': first['u_created_at'],
+            'last_active': first['u_last_active']
+        }
+        version = (first['u_id'], first['u_tokens_updated_at'], first['u_token_count'])
+
+        platforms = []
+        for row in rows:
+            if row['platform'] is None:
+                continue  # LEFT JOIN row for a user with no tokens
+            platform_data = {k: row[k] for k in row.keys() if not k.startswith('u_')}
+            if platform_data.get('platform_user_data'):
+                platform_data['platform_user_data'] = json.loads(platform_data['platform_user_data'])
+            platforms.append(platform_data)
+        return user, platforms, version
+
+    def get_session_token_version(self, session_id: str) -> Optional[Tuple[int, Optional[str], int]]:
+        """Get (user_id, latest token update, token count) for a session, or None if unknown"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT u.id, MAX(p.updated_at), COUNT(p.id)
+            FROM users u
+            LEFT JOIN platform_tokens p ON p.user_id = u.id
+            WHERE u.session_id = ?
+            GROUP BY u.id
+        """, (session_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return tuple(row) if row else None
+
     def delete_platform_token(self, user_id: int, platform: str) -> bool:
         """Delete platform token (disconnect)"""
         conn = self.get_connection()
@@ -294,5 +398,30 @@ class Database:
         return deleted
 
 
-# Singleton instance
+class AsyncDatabase:
+    """
+    Awaitable view of a Database for use in async handlers
+
+    Every method of the wrapped Database is exposed as a coroutine that runs
+    the blocking sqlite3 call in a worker thread, so queries don't stall the
+    event loop. Each call opens its own connection, which keeps this safe
+    across threads.
+    """
+
+    def __init__(self, database: Database):
+        self._db = database
+
+    def __getattr__(self, name: str):
+        method = getattr(self._db, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+
+# Singleton instances
 db = Database()
+db_async = AsyncDatabase(db)
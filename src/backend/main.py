@@ -11,7 +11,9 @@ from api.endpoints import content  # AI content endpoints
 from api.endpoints import health as health_monitoring  # AI health monitoring
 from api.endpoints import analytics  # AI analytics & trending
 from api.endpoints import auth  # OAuth authentication
+from api.middleware import PlatformValidatorMiddleware
 from jobs.health_scheduler import start_health_monitoring, stop_health_monitoring
+from auth.oauth_handlers import close_http_session
 import logging
 
 # Configure logging
@@ -26,6 +28,10 @@ app = FastAPI(
     version="3.0.0"
 )
 
+# Reject unknown {platform} path segments before routing
+# (added before CORS so error responses still get CORS headers)
+app.add_middleware(PlatformValidatorMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -68,14 +74,16 @@ async def startup_event():
 
 # Shutdown event - Stop health monitoring
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     """
     Application shutdown event
     - Stop health monitoring scheduler
+    - Close the shared OAuth HTTP session
     - Cleanup resources
     """
     print("⏹️ PostProber AI API Shutting down...")
     stop_health_monitoring()
+    await close_http_session()
     print("✅ Shutdown complete")
 
 